@@ -6,10 +6,18 @@ from typing import Union
 import numpy as np
 import pandas as pd
 from scipy.cluster.hierarchy import linkage, fcluster
-from scipy.spatial.distance import pdist
 from sklearn.metrics import pairwise_distances
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.cluster import MiniBatchKMeans
 import jellyfish  # string distance functinos
 # reference for jellyfish: https://github.com/jamesturk/jellyfish/blob/main/docs/index.md
+from app.stringDistance import getCondensedDistanceMatrix, widenDistanceMatrix, getDistanceOfPairs, getDistanceOfRows, prepareStringData, SIMILARITY_METRIC, COMPACT_DISTANCE_METRIC
+from app.candidateBlocking import getCandidatePairs, getSingleLinkageMatrixFromGraph
+from app.matrixCache import MatrixCache
+from app.dendrogramCut import DendrogramCutIndex
+from app.stageMetrics import stageMetrics
+from app.lruCache import LRUCache
+from app.stringPreprocessor import preprocessStringList
 
 
 class Cluster(ABC):
@@ -79,14 +87,59 @@ class StringCluster(Cluster, ABC):
         dataList (list): A list of string
         targetNumberOfCluster (int): The desired number of clusters.
         stringPreprocessor (function:str->str): a function to preprocess the string, whose input and output is string
+        addedStringList (list): the strings added by addStringList after the clustering, they are not in the distance matrix and linkage matrix
+        addedNearestIndex (np.ndarray): addedNearestIndex[i] is the index in dataList of the string nearest to addedStringList[i]
 
     Behaviors:
         __init__: Validates the datalist and numberofcluster, construct the object from args
         _validateDataList: Validates the data, the data is valid if all the data points string
         _validateNumberOfCluster: Validates the number of cluster, the number is valid if 1<=number<=len(set(data))
         getClusterId: Returns a list of cluster IDs corresponding to the data in the dataList.
+        addStringList (newStringList): add strings without clustering again, each new string joins the cluster of its nearest string in dataList
     '''
 
+    def _resetAddedString(self):
+        '''
+        remove the strings added by addStringList
+        '''
+        self.addedStringList: list[str] = []
+        self.addedNearestIndex = np.zeros(0, dtype=np.int64)
+
+    def addStringList(self, newStringList: list[str]) -> int:
+        '''
+        add the strings which are not in the cluster yet, the distance matrix and linkage matrix are not computed again,
+        only the distances between the new strings and the strings of dataList are computed, each new string joins the cluster of its nearest string.
+        return the number of string added
+        '''
+        self._validateDataList(newStringList)
+        existingStringSet = set(self.getDataList())
+        newStringList = [string for string in dict.fromkeys(
+            newStringList) if string not in existingStringSet]
+        if len(newStringList) == 0:
+            return 0
+        distanceMatrix = getDistanceOfRows(preprocessStringList(newStringList, self.stringPreprocessor),
+                                           list(self._getPreprocessedStringList()), self.distanceMetric)
+        if self.distanceMetric in SIMILARITY_METRIC:
+            nearestIndex = distanceMatrix.argmax(axis=1)
+        else:
+            nearestIndex = distanceMatrix.argmin(axis=1)
+        self.addedStringList = self.addedStringList + newStringList
+        self.addedNearestIndex = np.concatenate(
+            [self.addedNearestIndex, nearestIndex])
+        return len(newStringList)
+
+    def _getPreprocessedStringList(self) -> list[str]:
+        '''
+        return the preprocessed strings of dataList, aligned to dataList
+        '''
+        return preprocessStringList(self.dataList, self.stringPreprocessor)
+
+    def _expandClusterIdList(self, clusterIdList: list[int]) -> list[int]:
+        '''
+        return the clusterIdList of dataList followed by the cluster ids of the added strings
+        '''
+        return clusterIdList + [clusterIdList[index] for index in self.addedNearestIndex]
+
 
 class LinkageBasedStringCluster(StringCluster):
     '''
@@ -105,6 +158,19 @@ class LinkageBasedStringCluster(StringCluster):
 
         stringPreprocessor (function:str->str): a function to preprocess the string, whose input and output is string
 
+        matrixCache (MatrixCache or None): if provided, the distance matrix and linkage matrix are loaded from it or saved to it
+
+        numberOfWorker (int): the number of threads or processes used to compute the distance matrix
+
+        compactDistanceMatrix (bool): if True, the distance matrix is stored with a smaller type, see app.stringDistance.getCompactDistanceType
+
+        linkageCache (LRUCache): linkageMethod -> (linkageMatrix, dendrogramCutIndex) of the current distance matrix, so changing back to a linkage method doesn't compute it again
+
+        distinctPreprocessedStringList (list): the distinct preprocessed strings of dataList, in order of first appearance,
+            the strings of dataList that are the same after preprocessing (like 'Tesco' and 'TESCO.') are only one row of the distance matrix and linkage matrix
+
+        distinctIndex (np.ndarray): distinctIndex[i] is the index of the preprocessed dataList[i] in distinctPreprocessedStringList
+
     Behaviors:
         __init__: Validates the args, construct the object from args or raise error.
         _validateDataList(private): Validates the data
@@ -114,6 +180,7 @@ class LinkageBasedStringCluster(StringCluster):
         _validateStringPreprocessor(private): Validates preprocessor
         setNumberOfCluster (targetNumberOfCluster): set the number of cluster if the number is valid.
         getClusterId: Returns a list of cluster IDs corresponding to the data in the dataList.
+        precomputeLinkageMatrices (linkageMethodList): compute the linkage matrices of other linkage methods into linkageCache, without changing the linkage method
 
     # reference: Algorithm to Cluster Similar Strings in Python | Saturn Cloud Blog. (2023, July 18). https://saturncloud.io/blog/algorithm-to-cluster-similar-strings-in-python/
 
@@ -125,7 +192,7 @@ class LinkageBasedStringCluster(StringCluster):
     VALID_LINKAGE_METHOD = ['average', 'single',
                             'complete', 'weighted', 'centroid', 'median', 'ward']
 
-    def __init__(self, dataList: list[str], targetNumberOfCluster: int, distanceMetric: str, linkageMethod: str, stringPreprocessor: Callable[[str], str], testMode=False):
+    def __init__(self, dataList: list[str], targetNumberOfCluster: int, distanceMetric: str, linkageMethod: str, stringPreprocessor: Callable[[str], str], testMode=False, matrixCache: Union[MatrixCache, None] = None, numberOfWorker: int = 1, compactDistanceMatrix: bool = False, linkageCacheSize: int = len(VALID_LINKAGE_METHOD)):
         '''
         Initialise the object 
         dataList (list): A list of string
@@ -140,8 +207,21 @@ class LinkageBasedStringCluster(StringCluster):
 
         stringPreprocessor (function:str->str): a function to preprocess the string, whose input and output is string
 
+        matrixCache (MatrixCache or None): if provided, the distance matrix and linkage matrix are loaded from it if they have been computed for the same
+            dataList, stringPreprocessor, distanceMetric and linkageMethod, otherwise they are computed and saved to it
+
+        numberOfWorker (int): if greater than 1, the distance matrix is computed by numberOfWorker threads (or processes, see app.stringDistance.isWorthParallel), the result is the same
+
+        compactDistanceMatrix (bool): if True, the distance matrix is stored as uint8/uint16 for 'levenshtein', 'damerauLevenshtein', 'hamming' and 'MatchRatingApproach',
+            8 times less memory, the jaro similarities stay float64. it is only widened to float64 while the linkage matrix is computed
+
+        linkageCacheSize (int): the number of linkage matrices kept for setLinkageMethod, all the linkage methods by default
         '''
         self.testMode = testMode
+        self.matrixCache = matrixCache
+        self.numberOfWorker = numberOfWorker
+        self.compactDistanceMatrix = compactDistanceMatrix
+        self.linkageCache = LRUCache(linkageCacheSize)
         self._validateDataList(dataList)
         self._validateStringPreprocessor(stringPreprocessor)
         self._validateDistanceMetric(distanceMetric)
@@ -154,6 +234,7 @@ class LinkageBasedStringCluster(StringCluster):
         self.distanceMetric = distanceMetric
         self.linkageMethod = linkageMethod
         self.targetNumberOfCluster = targetNumberOfCluster
+        self._resetAddedString()
 
         # by default, preprocessedDataArry
         self.__updatePreprocessedStringArray()
@@ -167,6 +248,7 @@ class LinkageBasedStringCluster(StringCluster):
         '''
         self._validateDataList(dataList)
         self.dataList = dataList
+        self._resetAddedString()
         if updateChainning:
             self.__updatePreprocessedStringArray()
             self.__updateDistanceMatrix()
@@ -197,7 +279,7 @@ class LinkageBasedStringCluster(StringCluster):
 
     def setLinkageMethod(self, linkageMethod: str):
         '''
-        Validate the linkageMethod, update the linkageMatrix
+        Validate the linkageMethod, update the linkageMatrix, it is only computed if it isn't in self.linkageCache
         '''
         self._validateLinkageMethod(linkageMethod)
         self.linkageMethod = linkageMethod
@@ -208,30 +290,40 @@ class LinkageBasedStringCluster(StringCluster):
         return self.preprocessedStringArray
 
     def getDistanceMatrix(self):
+        '''
+        return the condensed distance matrix of self.distinctPreprocessedStringList,
+        with the compact type if compactDistanceMatrix is True, see app.stringDistance.widenDistanceMatrix
+        '''
         return self.distanceMatrix
 
     def getLinkageMatrix(self):
         return self.linkageMatrix
 
+    @stageMetrics.timed('dendrogramCut')
     def getClusterIdList(self, targetNumberOfCluster: int) -> list[int]:
         '''
         Raise ValueError if targetNumberOfCluster is invalid (not implemented)
         Returns a list of cluster IDs corresponding to the data in dataList, distanceMetrics, linkageMethod and Preprocessor
+        the dendrogram of the distinct preprocessed strings is cut into exactly targetNumberOfCluster clusters (limited to 1 and their number) by self.dendrogramCutIndex,
+        then each string of dataList gets the cluster id of its preprocessed string
+        the strings added by addStringList follow, with the cluster id of their nearest string
         '''
-        optimalThreshold = self._searchOptimalThreshold(
-            self.linkageMatrix, targetNumberOfCluster)
-        cluster = fcluster(self.linkageMatrix, optimalThreshold, 'distance')
-        return list(cluster)
+        cluster = self.dendrogramCutIndex.getClusterIdList(
+            targetNumberOfCluster)
+        return self._expandClusterIdList(cluster[self.distinctIndex].tolist())
 
     def getDataList(self) -> list[str]:
         '''
-        return a list of string which is aligned to the cluster id list
+        return a list of string which is aligned to the cluster id list, the strings added by addStringList are at the end
         '''
-        return self.dataList
+        return self.dataList + self.addedStringList
+
+    def _getPreprocessedStringList(self) -> list[str]:
+        return self.preprocessedStringArray[:, 0]
 
     def getClusterInfo(self):
         return {
-            'dataList': self.dataList,
+            'dataList': self.getDataList(),
             'stringPreprocessor': self.stringPreprocessor.__doc__,
             'distanceMetric': self.distanceMetric,
             'linkageMethod': self.linkageMethod,
@@ -241,34 +333,124 @@ class LinkageBasedStringCluster(StringCluster):
         return '/n'.join([str(string)for string in self.getClusterInfo()])
 
     # updater method
+    @stageMetrics.timed('preprocess')
     def __updatePreprocessedStringArray(self):
         '''
         update self.preprocessedStringArray based on self.stringPreprocessor and self.dataList
+        the strings are preprocessed in a batch and memoised, see app.stringPreprocessor.preprocessStringList
         '''
-        preprocessedStringList: list[str] = [
-            self.stringPreprocessor(string) for string in self.dataList]
+        preprocessedStringList: list[str] = preprocessStringList(
+            self.dataList, self.stringPreprocessor)
         preprocessedStringArray = pd.Series(
             preprocessedStringList).to_numpy().reshape(len(preprocessedStringList), 1)
         self.preprocessedStringArray = preprocessedStringArray
+        # the matrices are computed on the distinct preprocessed strings, see getClusterIdList
+        distinctIndex, distinctPreprocessedStringArray = pd.factorize(
+            pd.Series(preprocessedStringList, dtype=object), sort=False)
+        self.distinctIndex = distinctIndex.astype(np.int64)
+        self.distinctPreprocessedStringList: list[str] = distinctPreprocessedStringArray.tolist()
 
+    @stageMetrics.timed('distanceMatrix')
     def __updateDistanceMatrix(self):
         '''
-        update self.distanceMatrix based on the preprocessedStringArray and distance function
-        '''
-        vectorisedDistanceFunction = self._getDistanceFunction(
-            self.distanceMetric, True)
-        distanceMatrix = pdist(self.preprocessedStringArray,
-                                metric=vectorisedDistanceFunction)
-
+        update self.distanceMatrix based on the distinctPreprocessedStringList and distance function
+        the matrix is computed in batches by app.stringDistance, it has the same values as pdist with self._getDistanceFunction
+        if self.matrixCache is provided, load the matrix from it or save the matrix to it
+        '''
+        # the cached linkage matrices are the ones of the old distance matrix
+        self.linkageCache.clear()
+        numberOfString = len(self.distinctPreprocessedStringList)
+        expectedShape = (numberOfString * (numberOfString - 1) // 2,)
+        if self.matrixCache == None:
+            self.distanceMatrix = getCondensedDistanceMatrix(
+                self.distinctPreprocessedStringList, self.distanceMetric, self.numberOfWorker, self.compactDistanceMatrix)
+            return
+        key = self.__getDistanceMatrixKey()
+        # when several processes build the same clusterer, one computes the matrix and the others wait and load it
+        with self.matrixCache.lock(key):
+            distanceMatrix = self.matrixCache.load(key, expectedShape)
+            if distanceMatrix is None:
+                distanceMatrix = getCondensedDistanceMatrix(
+                    self.distinctPreprocessedStringList, self.distanceMetric, self.numberOfWorker, self.compactDistanceMatrix)
+                self.matrixCache.save(key, distanceMatrix)
+                # use the memory-mapped file instead, so its memory is shared with the other processes
+                distanceMatrix = self.__loadSavedMatrix(
+                    key, expectedShape, distanceMatrix)
         self.distanceMatrix = distanceMatrix
 
-    def __updateLinkageMatrix(self):
+    def __loadSavedMatrix(self, key: str, expectedShape: tuple, matrix: np.ndarray) -> np.ndarray:
         '''
-        update self.linkageMatrix based on the distanceMatrix and linkageMethod
+        return the memory-mapped matrix just saved with the key, or the matrix if it can't be loaded
         '''
-        # create linkage_matrix
-        self.linkageMatrix = linkage(
-            self.distanceMatrix, method=self.linkageMethod)
+        savedMatrix = self.matrixCache.load(key, expectedShape)
+        return matrix if savedMatrix is None else savedMatrix
+
+    def __updateLinkageMatrix(self):
+        '''
+        update self.linkageMatrix based on the distanceMatrix and linkageMethod, from self.linkageCache if it has been computed
+        '''
+        linkageResult = self.linkageCache.get(self.linkageMethod)
+        if linkageResult == None:
+            linkageResult = self.__getLinkageResult(self.linkageMethod)
+            self.linkageCache.put(self.linkageMethod, linkageResult)
+        self.linkageMatrix, self.dendrogramCutIndex = linkageResult
+
+    def precomputeLinkageMatrices(self, linkageMethodList: Union[list[str], None] = None):
+        '''
+        compute the linkage matrices of linkageMethodList (VALID_LINKAGE_METHOD by default) that aren't in self.linkageCache,
+        so setLinkageMethod only looks them up. the linkage method of the clusterer doesn't change, it can run in a background thread
+        '''
+        for linkageMethod in linkageMethodList if linkageMethodList != None else LinkageBasedStringCluster.VALID_LINKAGE_METHOD:
+            self._validateLinkageMethod(linkageMethod)
+            if linkageMethod in self.linkageCache:
+                continue
+            distanceMatrix = self.distanceMatrix
+            linkageResult = self.__getLinkageResult(linkageMethod)
+            # don't cache the linkage matrix if the distance matrix has changed meanwhile
+            if self.distanceMatrix is distanceMatrix:
+                self.linkageCache.put(linkageMethod, linkageResult)
+
+    def getLinkageCacheInfo(self) -> dict:
+        return {**self.linkageCache.getInfo(), 'linkageMethod': self.linkageCache.keys()}
+
+    @stageMetrics.timed('linkage')
+    def __getLinkageResult(self, linkageMethod: str) -> tuple[np.ndarray, DendrogramCutIndex]:
+        '''
+        return (linkageMatrix, dendrogramCutIndex) of the distanceMatrix with the linkageMethod,
+        if self.matrixCache is provided, load the matrix from it or save the matrix to it
+        '''
+        expectedShape = (len(self.distinctPreprocessedStringList) - 1, 4)
+        if expectedShape[0] == 0:
+            # a single distinct string is a single cluster, scipy doesn't link less than 2 observations
+            linkageMatrix = np.zeros(expectedShape)
+        elif self.matrixCache == None:
+            # create linkage_matrix
+            linkageMatrix = linkage(
+                widenDistanceMatrix(self.distanceMatrix, self.distanceMetric), method=linkageMethod)
+        else:
+            key = self.__getLinkageMatrixKey(linkageMethod)
+            with self.matrixCache.lock(key):
+                linkageMatrix = self.matrixCache.load(key, expectedShape)
+                if linkageMatrix is None:
+                    linkageMatrix = linkage(
+                        widenDistanceMatrix(self.distanceMatrix, self.distanceMetric), method=linkageMethod)
+                    self.matrixCache.save(key, linkageMatrix)
+                    linkageMatrix = self.__loadSavedMatrix(
+                        key, expectedShape, linkageMatrix)
+        return linkageMatrix, DendrogramCutIndex(linkageMatrix)
+
+    def __getDistanceMatrixKey(self) -> str:
+        '''
+        the key of the distance matrix in self.matrixCache, the distance matrix only depends on the distinct preprocessed strings and the distanceMetric,
+        so the dataLists that are the same after preprocessing share their matrices
+        '''
+        if self.compactDistanceMatrix and self.distanceMetric in COMPACT_DISTANCE_METRIC:
+            # the compact matrix has another type
+            return MatrixCache.getKey('distinctDistance', self.distinctPreprocessedStringList, self.distanceMetric, 'compact')
+        return MatrixCache.getKey('distinctDistance', self.distinctPreprocessedStringList, self.distanceMetric)
+
+    def __getLinkageMatrixKey(self, linkageMethod: str) -> str:
+        return MatrixCache.getKey('linkage', self.__getDistanceMatrixKey(), linkageMethod)
 
     def _validateDataList(self, dataList: list[str]) -> bool:
         '''
@@ -313,8 +495,8 @@ class LinkageBasedStringCluster(StringCluster):
         -------
             ValueError if not the targetNumberOfCluster is not valid
         '''
-        preprocessedString = [validStringPreprocessor(
-            string) for string in validDataList]
+        preprocessedString = preprocessStringList(
+            validDataList, validStringPreprocessor)
         if 1 <= targetNumberOfCluster <= len(set(preprocessedString)):
             return True
         else:
@@ -399,6 +581,7 @@ class LinkageBasedStringCluster(StringCluster):
         '''
             Based on the distanceMetric, Return a string distance function  that compares two string
             If vectorise is True, the returned funciton is vetorised.
+            it is no longer used to build the distance matrix, see app.stringDistance, but kept as the reference implementation
         '''
         function = None
         match distanceMetric:
@@ -426,9 +609,11 @@ class LinkageBasedStringCluster(StringCluster):
         else:
             return function
 
+    @stageMetrics.timed('thresholdSearch')
     def _searchOptimalThreshold(self, linkageMatrix, targetNumberOfCluster) -> float:
         '''
         Return the threshold so that the linkageMatrix can produce the closest targetNumberOfCluster, do 100 search
+        getClusterIdList uses self.dendrogramCutIndex instead, which always gives exactly targetNumberOfCluster clusters
         '''
         linkageMatrixDistance = linkageMatrix[:, 2]
         minDistance = linkageMatrixDistance.min()
@@ -468,3 +653,249 @@ class LinkageBasedStringCluster(StringCluster):
             numberOfSearch += 1
         # print(numberOfSearch, midThreshold, optimalNumberOfCluster)
         return optimalThreshold
+
+
+class BlockedSingleLinkageStringCluster(StringCluster):
+    '''
+    Cluster a large list of string with single linkage, without the n(n-1)/2 distance matrix.
+    Candidate pairs are the strings sharing character n-grams (see app.candidateBlocking), the distance is only computed for these pairs,
+    and the single linkage is the minimum spanning tree of the sparse graph. Memory and time grow about linearly with the number of string.
+    The similarity metrics ('jaroSimilarity', 'jaroWinklerSimilarity', 'MatchRatingApproach') are turned into distance by 1 - similarity.
+
+    Attributes:
+        dataList (list): A list of string
+
+        distanceMetric (str): one of LinkageBasedStringCluster.VALID_DISTANCE_METRIC
+
+        stringPreprocessor (function:str->str): a function to preprocess the string, whose input and output is string
+
+        gramSize, maxGramFrequency, numberOfNeighbour, sortedNeighbourWindow: see app.candidateBlocking.getCandidatePairs
+
+    Behaviors:
+        __init__: Validates the args, construct the object from args or raise error.
+        getClusterIdList (targetNumberOfCluster): Returns a list of cluster IDs corresponding to the data in the dataList.
+            The strings not connected by candidate pairs are never in the same cluster, so there can be more clusters than targetNumberOfCluster
+    '''
+    LINKAGE_METHOD = 'single'
+
+    def __init__(self, dataList: list[str], targetNumberOfCluster: int, distanceMetric: str, stringPreprocessor: Callable[[str], str], gramSize: int = 3, maxGramFrequency: int = 100, numberOfNeighbour: int = 20, sortedNeighbourWindow: int = 2):
+        self._validateDataList(dataList)
+        self._validateStringPreprocessor(stringPreprocessor)
+        self._validateDistanceMetric(distanceMetric)
+        self._validateNumberOfCluster(
+            targetNumberOfCluster, dataList, stringPreprocessor)
+
+        self.dataList = dataList
+        self.stringPreprocessor = stringPreprocessor
+        self.distanceMetric = distanceMetric
+        self.linkageMethod = BlockedSingleLinkageStringCluster.LINKAGE_METHOD
+        self.targetNumberOfCluster = targetNumberOfCluster
+        self.gramSize = gramSize
+        self.maxGramFrequency = maxGramFrequency
+        self.numberOfNeighbour = numberOfNeighbour
+        self.sortedNeighbourWindow = sortedNeighbourWindow
+
+        with stageMetrics.time('preprocess'):
+            self.preprocessedStringList = preprocessStringList(
+                self.dataList, self.stringPreprocessor)
+        self._resetAddedString()
+        self.__updateLinkageMatrix()
+
+    # the validation is the same as LinkageBasedStringCluster
+    _validateDataList = LinkageBasedStringCluster._validateDataList
+    _validateNumberOfCluster = LinkageBasedStringCluster._validateNumberOfCluster
+    _validateDistanceMetric = LinkageBasedStringCluster._validateDistanceMetric
+    _validateStringPreprocessor = LinkageBasedStringCluster._validateStringPreprocessor
+
+    @stageMetrics.timed('candidateLinkage')
+    def __updateLinkageMatrix(self):
+        '''
+        update self.linkageMatrix from the candidate pairs of self.preprocessedStringList
+        '''
+        rowIndex, columnIndex = getCandidatePairs(
+            self.preprocessedStringList, self.gramSize, self.maxGramFrequency, self.numberOfNeighbour, self.sortedNeighbourWindow)
+        distance = getDistanceOfPairs(prepareStringData(self.preprocessedStringList, self.distanceMetric),
+                                      self.distanceMetric, rowIndex, columnIndex)
+        if self.distanceMetric in SIMILARITY_METRIC:
+            distance = 1 - distance
+        self.numberOfCandidatePair = rowIndex.size
+        self.linkageMatrix, self.numberOfComponent = getSingleLinkageMatrixFromGraph(
+            len(self.dataList), rowIndex, columnIndex, distance)
+        self.dendrogramCutIndex = DendrogramCutIndex(self.linkageMatrix)
+
+    # getters
+    def getPreprocessedData(self):
+        return self.preprocessedStringList
+
+    def getLinkageMatrix(self):
+        return self.linkageMatrix
+
+    @stageMetrics.timed('dendrogramCut')
+    def getClusterIdList(self, targetNumberOfCluster: int) -> list[int]:
+        '''
+        Returns a list of cluster IDs corresponding to the data in dataList,
+        the number of cluster is targetNumberOfCluster, or the number of connected components of the candidate graph if it is greater
+        the strings added by addStringList follow, with the cluster id of their nearest string
+        '''
+        cluster = self.dendrogramCutIndex.getClusterIdList(
+            max(targetNumberOfCluster, self.numberOfComponent))
+        return self._expandClusterIdList(cluster.tolist())
+
+    def getDataList(self) -> list[str]:
+        '''
+        return a list of string which is aligned to the cluster id list, the strings added by addStringList are at the end
+        '''
+        return self.dataList + self.addedStringList
+
+    def _getPreprocessedStringList(self) -> list[str]:
+        return self.preprocessedStringList
+
+    def getClusterInfo(self):
+        return {
+            'dataList': self.getDataList(),
+            'stringPreprocessor': self.stringPreprocessor.__doc__,
+            'distanceMetric': self.distanceMetric,
+            'linkageMethod': self.linkageMethod,
+        }
+
+
+class TfidfStringCluster(StringCluster):
+    '''
+    Cluster a large list of string by their character n-grams, without any pairwise distance.
+    Each distinct preprocessed string is a sparse TF-IDF vector of its character n-grams (the n-grams don't cross the words),
+    the vectors are clustered by MiniBatchKMeans, so the time and the memory grow linearly with the number of string.
+    Two strings are close if they share their rare n-grams, like 'tesco stores 3297' and 'tesco stores 2164'.
+
+    Attributes:
+        dataList (list): A list of string
+
+        stringPreprocessor (function:str->str): a function to preprocess the string, whose input and output is string
+
+        gramRange (tuple): the minimum and maximum n of the character n-grams
+
+        batchSize, maxIteration: see sklearn.cluster.MiniBatchKMeans
+
+        clusterCache (LRUCache): targetNumberOfCluster -> cluster id of each distinct preprocessed string
+
+    Behaviors:
+        __init__: Validates the args, construct the object from args or raise error.
+        getClusterIdList (targetNumberOfCluster): Returns a list of cluster IDs corresponding to the data in the dataList.
+            KMeans can leave a cluster empty, so there can be fewer clusters than targetNumberOfCluster
+        addStringList (newStringList): add the strings and compute the vectors again, it is linear too
+    '''
+    LINKAGE_METHOD = None
+    DISTANCE_METRIC = 'tfidfCosine'
+
+    def __init__(self, dataList: list[str], targetNumberOfCluster: int, stringPreprocessor: Callable[[str], str], gramRange: tuple[int, int] = (2, 4), batchSize: int = 4096, maxIteration: int = 100, clusterCacheSize: int = 16):
+        self._validateDataList(dataList)
+        self._validateStringPreprocessor(stringPreprocessor)
+        self._validateNumberOfCluster(
+            targetNumberOfCluster, dataList, stringPreprocessor)
+
+        self.dataList = dataList
+        self.stringPreprocessor = stringPreprocessor
+        self.distanceMetric = TfidfStringCluster.DISTANCE_METRIC
+        self.linkageMethod = TfidfStringCluster.LINKAGE_METHOD
+        self.targetNumberOfCluster = targetNumberOfCluster
+        self.gramRange = gramRange
+        self.batchSize = batchSize
+        self.maxIteration = maxIteration
+        self.clusterCache = LRUCache(clusterCacheSize)
+        self._resetAddedString()
+        self.__updateVectors()
+
+    # the validation is the same as LinkageBasedStringCluster
+    _validateDataList = LinkageBasedStringCluster._validateDataList
+    _validateNumberOfCluster = LinkageBasedStringCluster._validateNumberOfCluster
+    _validateStringPreprocessor = LinkageBasedStringCluster._validateStringPreprocessor
+
+    @stageMetrics.timed('tfidfVectorize')
+    def __updateVectors(self):
+        '''
+        update self.vectors, the L2 normalised TF-IDF vectors (a scipy sparse matrix) of the distinct preprocessed strings of dataList,
+        the cosine distance of two vectors is half of their squared euclidean distance, so KMeans on them clusters by cosine distance.
+        the vectors are float64, sklearn converts float32 sparse matrices chunk by chunk when computing the distances, it is 3 times slower
+        '''
+        self.preprocessedStringList = preprocessStringList(
+            self.dataList, self.stringPreprocessor)
+        distinctIndex, distinctPreprocessedStringArray = pd.factorize(
+            pd.Series(self.preprocessedStringList, dtype=object), sort=False)
+        self.distinctIndex = distinctIndex.astype(np.int64)
+        self.distinctPreprocessedStringList: list[str] = distinctPreprocessedStringArray.tolist()
+        # reference: https://scikit-learn.org/stable/modules/feature_extraction.html#tfidf-term-weighting
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=self.gramRange,
+                                     sublinear_tf=True, dtype=np.float64)
+        if any(len(string) > 0 for string in self.distinctPreprocessedStringList):
+            self.vectors = vectorizer.fit_transform(
+                self.distinctPreprocessedStringList)
+        else:
+            # no n-gram at all, every string is in the same cluster
+            self.vectors = None
+        self.clusterCache.clear()
+
+    def addStringList(self, newStringList: list[str]) -> int:
+        '''
+        add the strings which are not in the cluster yet, the vectors are computed again (the document frequencies change),
+        so the new strings are clustered like the others. return the number of string added
+        '''
+        self._validateDataList(newStringList)
+        existingStringSet = set(self.dataList)
+        newStringList = [string for string in dict.fromkeys(
+            newStringList) if string not in existingStringSet]
+        if len(newStringList) == 0:
+            return 0
+        self.dataList = self.dataList + newStringList
+        self.__updateVectors()
+        return len(newStringList)
+
+    @stageMetrics.timed('tfidfKMeans')
+    def getClusterIdList(self, targetNumberOfCluster: int) -> list[int]:
+        '''
+        Returns a list of cluster IDs (from 1) corresponding to the data in dataList,
+        targetNumberOfCluster is limited to 1 and the number of distinct preprocessed string, the result of each targetNumberOfCluster is cached
+        '''
+        numberOfDistinct = len(self.distinctPreprocessedStringList)
+        targetNumberOfCluster = min(max(1, targetNumberOfCluster), numberOfDistinct)
+        distinctClusterId = self.clusterCache.get(targetNumberOfCluster)
+        if distinctClusterId is None:
+            distinctClusterId = self.__getDistinctClusterId(targetNumberOfCluster)
+            self.clusterCache.put(targetNumberOfCluster, distinctClusterId)
+        return distinctClusterId[self.distinctIndex].tolist()
+
+    def __getDistinctClusterId(self, targetNumberOfCluster: int) -> np.ndarray:
+        numberOfDistinct = len(self.distinctPreprocessedStringList)
+        if self.vectors is None or targetNumberOfCluster == 1:
+            return np.ones(numberOfDistinct, dtype=np.int64)
+        if targetNumberOfCluster == numberOfDistinct:
+            return np.arange(1, numberOfDistinct + 1, dtype=np.int64)
+        # reference: https://scikit-learn.org/stable/modules/generated/sklearn.cluster.MiniBatchKMeans.html
+        # one init, the inits of MiniBatchKMeans are compared on a sample only, and no reassignment, the small clusters of rare merchants are kept
+        kmeans = MiniBatchKMeans(n_clusters=targetNumberOfCluster, batch_size=self.batchSize, max_iter=self.maxIteration,
+                                 n_init=1, reassignment_ratio=0, random_state=0).fit(self.vectors)
+        # the empty clusters are removed, the ids are 1 to the number of cluster like the dendrogram cut
+        _, clusterId = np.unique(kmeans.labels_, return_inverse=True)
+        return clusterId.astype(np.int64) + 1
+
+    def getDataList(self) -> list[str]:
+        '''
+        return a list of string which is aligned to the cluster id list
+        '''
+        return self.dataList
+
+    # getters
+    def getPreprocessedData(self):
+        return self.preprocessedStringList
+
+    def getVectors(self):
+        return self.vectors
+
+    def _getPreprocessedStringList(self) -> list[str]:
+        return self.preprocessedStringList
+
+    def getClusterInfo(self):
+        return {
+            'dataList': self.getDataList(),
+            'stringPreprocessor': self.stringPreprocessor.__doc__,
+            'distanceMetric': self.distanceMetric,
+            'linkageMethod': self.linkageMethod,
+        }
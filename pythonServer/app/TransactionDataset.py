@@ -1,21 +1,65 @@
+import threading
+import hashlib
+import time
+import os
+import tempfile
+from contextlib import ExitStack
 import pandas as pd
 import numpy as np
 import sklearn.preprocessing
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from typing import Literal, Union
 from enum import Enum
-from app.Cluster import LinkageBasedStringCluster
+from app.Cluster import LinkageBasedStringCluster, BlockedSingleLinkageStringCluster, TfidfStringCluster
+from app.matrixCache import MatrixCache, DEFAULT_MAX_SIZE as DEFAULT_MATRIX_CACHE_MAX_SIZE
+from app.lruCache import LRUCache
+from app.dateIndex import SortedDateIndex
+from app.fileLock import fileLock
+from app.sharedDataframe import publishDataframe, isPublished, attachDataframe, selectColumns
 from app.stringPreprocessor import preprocess
+from app.stageMetrics import stageMetrics
 
 
 VALID_KMEAN_ITERATION = [1, 2000]
 VALID_KMEAN_N_INIT = [10, 1000]
+# the type of the columns of the csv file, the string columns with repeated values are categorical to save memory
+CSV_COLUMN_TYPE = {
+    'Transaction Number': 'int64',
+    'Transaction Date': 'object',
+    'Transaction Type': 'category',
+    'Transaction Description': 'category',
+    'Debit Amount': 'float64',
+    'Credit Amount': 'float64',
+    'Balance': 'float64',
+    'Category': 'category',
+    'Location City': 'category',
+    'Location Country': 'category',
+}
+CATEGORICAL_COLUMN_NAMES = ['transactionType', 'transactionDescription',
+                            'category', 'locationCity', 'locationCountry']
+TRANSACTION_DATE_FORMAT = '%d/%m/%Y'
+# change it when the way the csv file is loaded changes, so the old snapshots are not used anymore
+SNAPSHOT_VERSION = 1
+# the default time budget in seconds of the approximate KMeans
+DEFAULT_APPROXIMATE_KMEANS_TIME_BUDGET = 0.5
+# the number of rows of a mini batch of the approximate KMeans
+APPROXIMATE_KMEANS_BATCH_SIZE = 4096
+# the approximate KMeans stops when the centers move less than this in a whole pass over the data
+APPROXIMATE_KMEANS_TOLERANCE = 1e-6
+# the columns computed from the frequency option and clusterByKMeans, the other columns only change when transactions are added
+DERIVED_COLUMN_NAMES = ['frequencyUniqueKey', 'frequency', 'cluster']
+# the maximum number of clusterByKMeans results kept
+KMEANS_CACHE_SIZE = 64
+# above this number of unique transactionDescription, the n(n-1)/2 distance matrix is too big, BlockedSingleLinkageStringCluster is used instead
+SCALABLE_STRING_CLUSTER_THRESHOLD = 20000
 
 
 class FrequencyUniqueKey(Enum):
     CATEGORY = 'category'
     TRANSACTION_DESCRIPTION = 'transactionDescription'
     CLUSTERED_TRANSACTION_DESCRIPTION = 'clusteredTransactionDescription'
+    # clustered by the character n-grams of the transactionDescription, see TfidfStringCluster, linear in the number of transactionDescription
+    TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION = 'tfidfClusteredTransactionDescription'
 
 
 class DistanceMeasure(Enum):
@@ -27,6 +71,13 @@ class DistanceMeasure(Enum):
     MATCH_RATING_APPROACH = 'MatchRatingApproach'
 
 
+class KMeansEngine(Enum):
+    # sklearn KMeans on all the rows, nInit times
+    EXACT = 'exact'
+    # sklearn MiniBatchKMeans fitted batch by batch until the time budget is used, then every row is assigned to the closest center
+    APPROXIMATE = 'approximate'
+
+
 class LinkageMethod(Enum):
     SINGLE = 'single'
     COMPLETE = 'complete'
@@ -45,12 +96,14 @@ class FrequencyOption:
     def __init__(self, uniqueKey: FrequencyUniqueKey, distanceMeasure: Union[DistanceMeasure, None] = None, linkageMethod: Union[LinkageMethod, None] = None, numberOfCluster: Union[int, None] = None, per: Literal['month', 'day'] = 'month'):
         '''
             initialise the frequencyOption object
-            uniqueKey: category or transactionDescription or clusteredTransactionDescription
+            uniqueKey: category or transactionDescription or clusteredTransactionDescription or tfidfClusteredTransactionDescription
 
             if uniqueKey = CLUSTERED_TRANSACTION_DESCRIPTION, the following parameters need to be provided
             distanceMeasure: levenshtein or damerauLevenshtein or hamming or jaroSimilarity or jaroWinklerSimilarity or MatchRatingApproach
             linkageMethod: single or complete or average or weighted or centroid or median or ward
             numberOfCluster: greater than 1
+
+            if uniqueKey = TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION, only numberOfCluster needs to be provided
         '''
         if uniqueKey not in FrequencyUniqueKey.__members__.values():
             raise ValueError('invalid uniqueKey')
@@ -63,6 +116,8 @@ class FrequencyOption:
                 raise ValueError('invalid linkageMethod')
             elif numberOfCluster == None:
                 raise ValueError('invalid numberOfCluster')
+        if (uniqueKey == FrequencyUniqueKey.TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION) and numberOfCluster == None:
+            raise ValueError('invalid numberOfCluster')
         self.distanceMeasure = distanceMeasure
         self.linkageMethod = linkageMethod
         self.numberOfCluster = numberOfCluster
@@ -94,6 +149,53 @@ class FrequencyOption:
     def getPer(self) -> Literal['month', 'day']:
         return self.per
 
+    def getOptionTuple(self) -> tuple:
+        '''
+            return a tuple of all the options, two frequency options with the same tuple give the same frequency
+        '''
+        return (self.getUniqueKey(), self.getDistanceMeasure(), self.getLinkageMethod(), self.getNumberOfCluster(), self.getPer())
+
+
+class TransactionDatasetView:
+    '''
+        the transactions of a TransactionDataset with the frequency and cluster columns of one set of options, see TransactionDataset.getView.
+        a view is never changed after it is created, the columns it shares with the dataset and the other views are never written in place
+    '''
+
+    def __init__(self, dataframe: pd.DataFrame, dataVersion: int, frequencyOption: FrequencyOption, kmeansArguments: dict, kmeansInfo: dict):
+        self.dataframe = dataframe
+        self.dataVersion = dataVersion
+        self.frequencyOption = frequencyOption
+        self.kmeansArguments = kmeansArguments
+        self.kmeansInfo = kmeansInfo
+
+    def getDataframe(self) -> pd.DataFrame:
+        return self.dataframe
+
+    def getDataVersion(self) -> int:
+        return self.dataVersion
+
+    def getFrequencyOption(self) -> FrequencyOption:
+        return self.frequencyOption
+
+    def getKMeansArguments(self) -> dict:
+        return self.kmeansArguments
+
+    def getKMeansInfo(self) -> dict:
+        return self.kmeansInfo
+
+    def getDerivedColumns(self) -> pd.DataFrame:
+        '''
+            return the transactionNumber and the DERIVED_COLUMN_NAMES columns, in the same order as getDataframe
+        '''
+        return selectColumns(self.dataframe, ['transactionNumber'] + DERIVED_COLUMN_NAMES)
+
+    def getClusterIdOfTransactionNumber(self) -> dict:
+        '''
+            return a dictionary where the key is transactionNumber and the value is the cluster.
+        '''
+        return selectColumns(self.dataframe, ['transactionNumber', 'cluster']).set_index('transactionNumber').to_dict(orient="index")
+
 
 class TransactionDataset:
     '''
@@ -102,30 +204,118 @@ class TransactionDataset:
         isCredit (boolean), transactionAmount (float), frequency(float), frequencyUniqueKey()
     '''
 
-    def __init__(self, csvPath: str):
+    def __init__(self, csvPath: str, matrixCacheDirectory: Union[str, None] = None, numberOfStringDistanceWorker: int = 1, scalableStringClusterThreshold: int = SCALABLE_STRING_CLUSTER_THRESHOLD, snapshotDirectory: Union[str, None] = None, sharedDataDirectory: Union[str, None] = None, precomputeLinkageMethods: bool = False, matrixCacheMaxSize: Union[int, None] = DEFAULT_MATRIX_CACHE_MAX_SIZE):
         '''
             read transactions from csv file, the data will be initialised
-        '''
-
-        self.dataframe: pd.DataFrame = pd.read_csv(csvPath)
-        self.__convertColumnNameToCammelCase()  # convert column name
-        # derive transactionAmount and isCredit column based on creditAmount and debitAmount column
-        self.__addTransactionAmountInfo()
-        # add dayOfYear dayOfWeek weekOfYear columns, set transactionData tobe datetime type
-        self.__cleanDateInfo()
-        # replace NaN in category column by 'unknown'
-        self.__cleanCategory()
+            snapshotDirectory: if provided, the cleaned transactions are saved in this folder as a feather (arrow) file after the csv file is loaded,
+                the next time the same csv file is loaded, the snapshot is read instead
+            matrixCacheDirectory: if provided, the distance matrices and linkage matrices of the string clusterers are cached in this folder
+            matrixCacheMaxSize: the maximum number of bytes of the matrices in matrixCacheDirectory, the least recently used are removed above it
+            numberOfStringDistanceWorker: the number of threads or processes used to compute the distance matrix of a string clusterer
+            scalableStringClusterThreshold: if there are more unique transactionDescription, the string clusterers only use single linkage on candidate pairs,
+                see BlockedSingleLinkageStringCluster
+            sharedDataDirectory: if provided, the processes loading the same csv file share the memory of the transactions:
+                the first process loads the csv file and publishes the columns in this folder, all the processes memory-map them read only.
+                use it with matrixCacheDirectory, so the matrices of the string clusterers are also computed once and memory-mapped.
+                the transactions can't be appended, because the other processes wouldn't see them
+            precomputeLinkageMethods: if True, warmUpStringClusterers also computes the linkage matrices of every linkage method,
+                so changing the linkageMethod of the frequency option doesn't compute the linkage matrix
+        '''
+
+        self.sharedDataDirectory = sharedDataDirectory
+        with stageMetrics.time('load'):
+            if sharedDataDirectory != None:
+                self.__attachSharedDataframe(
+                    csvPath, snapshotDirectory, sharedDataDirectory)
+            else:
+                self.__loadDataframe(csvPath, snapshotDirectory)
+        # held while self.dataframe and self.dataVersion are replaced together, see getView and appendTransactions
+        self.dataLock = threading.Lock()
+        # the arguments of the last clusterByKMeans, None if it hasn't been run
+        self.kmeansArguments = None
+        # the engine, inertia and elapsed time of the last clusterByKMeans, see getKMeansInfo
+        self.kmeansInfo = None
+        # cluster labels of clusterByKMeans, see __getKMeansCacheKey
+        self.kmeansCache = LRUCache(KMEANS_CACHE_SIZE)
+        # increased when the transactions change, so the cached results of the old transactions are not used
+        self.dataVersion = 0
+        # the transactions sorted by date for getTransactions, built on first use, rebuilt when the dataVersion changes
+        self.dateIndex = None
+        self.dateIndexVersion = None
         self.frequencyOption = FrequencyOption(
             FrequencyUniqueKey.TRANSACTION_DESCRIPTION)
         self.__updateFrequency()
         # there should exist frequency and frequencyUniqueKey column
 
-        # preload different stringClusterer for each distance metric
+        # stringClusterer for each distance metric, built on first use or by warmUpStringClusterers
         self.linkageBasedStringClusterers = {}
-        uniqueStringList = list(set(self.getColumn('transactionDescription')))
+        # sorted so that the order (and the key in the matrix cache) is the same in every process
+        self.uniqueStringList = sorted(
+            set(self.getColumn('transactionDescription')))
+        self.matrixCache = MatrixCache(
+            matrixCacheDirectory, maxSize=matrixCacheMaxSize) if matrixCacheDirectory != None else None
+        self.numberOfStringDistanceWorker = numberOfStringDistanceWorker
+        self.scalableStringClusterThreshold = scalableStringClusterThreshold
+        self.precomputeLinkageMethods = precomputeLinkageMethods
+        self.linkageBasedStringClustererLocks = {
+            distanceMeasure.value: threading.Lock() for distanceMeasure in DistanceMeasure.__members__.values()}
+        # the clusterer of tfidfClusteredTransactionDescription, built on first use
+        self.tfidfStringClusterer = None
+        self.tfidfStringClustererLock = threading.Lock()
+
+    def getLinkageBasedStringClusterer(self, distanceMeasure: str) -> Union[LinkageBasedStringCluster, BlockedSingleLinkageStringCluster]:
+        '''
+            return the stringClusterer of the distanceMeasure, build it if it hasn't been built.
+            it is safe to call from different threads, the clusterer of a distanceMeasure is only built once
+            if there are more than self.scalableStringClusterThreshold unique transactionDescription, a BlockedSingleLinkageStringCluster is built
+        '''
+        clusterer = self.linkageBasedStringClusterers.get(distanceMeasure)
+        if clusterer != None:
+            return clusterer
+        with self.linkageBasedStringClustererLocks[distanceMeasure]:
+            if distanceMeasure not in self.linkageBasedStringClusterers and len(self.uniqueStringList) > self.scalableStringClusterThreshold:
+                self.linkageBasedStringClusterers[distanceMeasure] = BlockedSingleLinkageStringCluster(
+                    self.uniqueStringList, 10, distanceMeasure, preprocess)
+            elif distanceMeasure not in self.linkageBasedStringClusterers:
+                self.linkageBasedStringClusterers[distanceMeasure] = LinkageBasedStringCluster(
+                    self.uniqueStringList, 10, distanceMeasure, 'average', preprocess, matrixCache=self.matrixCache, numberOfWorker=self.numberOfStringDistanceWorker, compactDistanceMatrix=True)
+        return self.linkageBasedStringClusterers[distanceMeasure]
+
+    def getTfidfStringClusterer(self) -> TfidfStringCluster:
+        '''
+            return the TfidfStringCluster of the unique transactionDescription, build it if it hasn't been built
+        '''
+        with self.tfidfStringClustererLock:
+            if self.tfidfStringClusterer == None:
+                self.tfidfStringClusterer = TfidfStringCluster(
+                    self.uniqueStringList, 1, preprocess)
+            return self.tfidfStringClusterer
+
+    def warmUpStringClusterers(self):
+        '''
+            build the stringClusterer of every distance metric that hasn't been built, run it in a background thread so that the server can serve requests meanwhile
+            if self.precomputeLinkageMethods, the linkage matrices of every linkage method are computed after all the clusterers are built
+        '''
         for distanceMeasure in DistanceMeasure.__members__.values():
-            self.linkageBasedStringClusterers[distanceMeasure.value] = LinkageBasedStringCluster(
-                uniqueStringList, 10, distanceMeasure.value, 'average', preprocess)
+            self.getLinkageBasedStringClusterer(distanceMeasure.value)
+        if self.precomputeLinkageMethods:
+            for distanceMeasure in DistanceMeasure.__members__.values():
+                clusterer = self.getLinkageBasedStringClusterer(distanceMeasure.value)
+                if isinstance(clusterer, LinkageBasedStringCluster):
+                    clusterer.precomputeLinkageMatrices()
+
+    def getLinkageCacheInfo(self) -> dict:
+        '''
+            return the hit, miss, size, maxSize and cached linkage methods of the linkage matrices of each built LinkageBasedStringCluster
+        '''
+        return {distanceMeasure: clusterer.getLinkageCacheInfo() for distanceMeasure, clusterer in list(self.linkageBasedStringClusterers.items())
+                if isinstance(clusterer, LinkageBasedStringCluster)}
+
+    def getStringClustererReadiness(self) -> dict:
+        '''
+            return a dictionary map distance metric to True if its stringClusterer has been built, like this: {'levenshtein': True, 'hamming': False, ...}
+        '''
+        return {distanceMeasure.value: distanceMeasure.value in self.linkageBasedStringClusterers for distanceMeasure in DistanceMeasure.__members__.values()}
 
     def getDataframe(self) -> pd.DataFrame:
         '''
@@ -135,6 +325,102 @@ class TransactionDataset:
         '''
         return self.dataframe
 
+    def getFrequencyOption(self) -> FrequencyOption:
+        return self.frequencyOption
+
+    def getView(self, frequencyOption: FrequencyOption, metric1, metric2, numberOfCluster, maxIteration: int = 300, nInit=10, engine: KMeansEngine = KMeansEngine.EXACT, timeBudget: Union[float, None] = None) -> 'TransactionDatasetView':
+        '''
+            return a view of the transactions with the frequency columns of frequencyOption and the cluster column of clusterByKMeans with the other arguments,
+            this dataset isn't changed, so the views with different options can be computed at the same time from different threads.
+            the view shares the other columns with self.dataframe without copying them
+        '''
+        if engine == KMeansEngine.APPROXIMATE and timeBudget == None:
+            timeBudget = DEFAULT_APPROXIMATE_KMEANS_TIME_BUDGET
+        kmeansArguments = {'metric1': metric1, 'metric2': metric2, 'numberOfCluster': numberOfCluster,
+                           'maxIteration': maxIteration, 'nInit': nInit, 'engine': engine, 'timeBudget': timeBudget}
+        with self.dataLock:
+            # a shallow copy, replacing a column of the copy doesn't change self.dataframe
+            dataframe = self.dataframe.copy(deep=False)
+            dataVersion = self.dataVersion
+        self.__setFrequencyColumns(dataframe, frequencyOption)
+        labels, kmeansInfo = self.__getKMeansResult(
+            dataframe, frequencyOption, dataVersion, **kmeansArguments)
+        dataframe['cluster'] = labels
+        return TransactionDatasetView(dataframe, dataVersion, frequencyOption, kmeansArguments, kmeansInfo)
+
+    def publishView(self, view: 'TransactionDatasetView') -> bool:
+        '''
+            make the view the state of this dataset, like calling setFrequencyOption and clusterByKMeans with its options,
+            return False and do nothing if transactions have been added since the view was computed
+        '''
+        with self.dataLock:
+            if view.getDataVersion() != self.dataVersion:
+                return False
+            # only the derived columns are taken from the view, the other columns of the view may have been merged into new arrays by pandas
+            dataframe = self.dataframe.copy(deep=False)
+            for columnName in DERIVED_COLUMN_NAMES:
+                dataframe[columnName] = view.getDataframe()[columnName]
+            self.dataframe = dataframe
+            self.frequencyOption = view.getFrequencyOption()
+            self.kmeansArguments = view.getKMeansArguments()
+            self.kmeansInfo = view.getKMeansInfo()
+            return True
+
+    def getDerivedColumns(self) -> pd.DataFrame:
+        '''
+            return the transactionNumber and the DERIVED_COLUMN_NAMES columns (the ones that exist), in the same order as getDataframe,
+            after setFrequencyOption or clusterByKMeans only these columns change
+        '''
+        return selectColumns(self.dataframe, ['transactionNumber'] + [columnName for columnName in DERIVED_COLUMN_NAMES if columnName in self.dataframe.columns])
+
+    def getTransactions(self, columnNames: Union[list[str], None] = None, startDate: Union[pd.Timestamp, None] = None, endDate: Union[pd.Timestamp, None] = None,
+                        categories: Union[list[str], None] = None, clusterIds: Union[list[int], None] = None, cursor: Union[str, None] = None, limit: Union[int, None] = None) -> tuple[pd.DataFrame, Union[str, None]]:
+        '''
+            return (the transactions sorted by transactionDate, the cursor of the next page or None if it is the last page)
+            columnNames: only return these columns, all the columns if None
+            startDate, endDate: only return the transactions with startDate <= transactionDate < endDate
+            categories, clusterIds: only return the transactions of these categories and clusters (clusterByKMeans should have been run)
+            cursor: the cursor returned with the previous page, the transactions before it are skipped
+            limit: the maximum number of transactions returned
+            raise ValueError if a column doesn't exist or the cursor is invalid
+        '''
+        for columnName in (columnNames or []) + (['cluster'] if clusterIds != None else []):
+            if self.isValidColumnName(columnName) == False:
+                raise ValueError(
+                    f"{columnName} is invalid, only support {str(self.getColumnNames())}")
+        if limit != None and limit < 1:
+            raise ValueError('limit should be at least 1, given: ' + str(limit))
+        if self.dateIndexVersion != self.dataVersion:
+            self.dateIndex = SortedDateIndex(self.dataframe['transactionDate'])
+            self.dateIndexVersion = self.dataVersion
+        positions = self.dateIndex.getRange(
+            startDate, endDate, self.__parseCursor(cursor) if cursor != None else None)
+        # the filters only look at the rows in the date range
+        if categories != None:
+            positions = positions[self.dataframe['category'].iloc[positions].isin(
+                categories).to_numpy()]
+        if clusterIds != None:
+            positions = positions[self.dataframe['cluster'].iloc[positions].isin(
+                clusterIds).to_numpy()]
+        nextCursor = None
+        if limit != None and positions.size > limit:
+            positions = positions[:limit]
+            nextCursor = '%d_%d' % self.dateIndex.getCursor(positions[-1])
+        return selectColumns(self.dataframe, columnNames if columnNames != None else self.getColumnNames(), positions), nextCursor
+
+    def __parseCursor(self, cursor: str) -> tuple[int, int]:
+        try:
+            date, position = cursor.split('_')
+            return int(date), int(position)
+        except ValueError:
+            raise ValueError('invalid cursor: ' + cursor)
+
+    def getDataVersion(self) -> int:
+        '''
+            return a number increased each time transactions are added, the rows of two dataframes with the same version are the same
+        '''
+        return self.dataVersion
+
     def setFrequencyOption(self, newFrequencyOption):
         '''
         Set the frequency option, update the frequency column, frequency Unique key Column. if frequency is based on clustering, algorithm will be run
@@ -148,69 +434,141 @@ class TransactionDataset:
         based on self.frequencyOption, update the frequencyUniqueKey column, and frequency column
         '''
         # update the 'frequencyUniqueKey' unique key column for frequency
-        frequencyUniqueKey = self.frequencyOption.getUniqueKey()
-        if (frequencyUniqueKey == FrequencyUniqueKey.TRANSACTION_DESCRIPTION.value):
-            self.dataframe['frequencyUniqueKey'] = self.dataframe[frequencyUniqueKey]
-        elif (frequencyUniqueKey == FrequencyUniqueKey.CATEGORY.value):
-            self.dataframe['frequencyUniqueKey'] = self.dataframe[frequencyUniqueKey]
-        else:
-            # set the 'ferquencyUniqueKey' as the clustered transactionDescription based on the distance metric
-            # key->value = transactinDiscription -> clusterId(for the string clustering)
-            stringClusterMap = self.__getStringClusterMap(self.frequencyOption)
-            self.dataframe['frequencyUniqueKey'] = self.dataframe['transactionDescription'].map(
-                stringClusterMap)
+        # if it is clusteredTransactionDescription, the key is the clusterId of the transactionDescription based on the distance metric
+        self.__setFrequencyColumns(self.dataframe, self.frequencyOption)
+
+    @stageMetrics.timed('updateFrequency')
+    def __setFrequencyColumns(self, dataframe: pd.DataFrame, frequencyOption: FrequencyOption):
+        '''
+        this method will mutate the dataframe, set its frequencyUniqueKey and frequency columns based on frequencyOption
+        the columns are replaced, not written in place, so the other dataframes sharing the columns (see getView) don't change
+        '''
+        dataframe['frequencyUniqueKey'] = self.__getFrequencyUniqueKey(
+            dataframe, frequencyOption)
 
         # add a 'frequency' column group by the frequencyUniqueKey and transactionDate Columns
-        frequency = self.dataframe.groupby(
-            'frequencyUniqueKey').apply(lambda x: self.__getFrequencyOfGroup(x, self.frequencyOption.getPer()))['frequency']
-        # print('frequency::::', frequency)
-        self.dataframe['frequency'] = self.dataframe['frequencyUniqueKey'].map(
-            frequency)
+        frequency = self.__getFrequency(dataframe, frequencyOption)
+        # map on a categorical column gives a categorical column when the frequencies are all different, kmeans would use its codes
+        dataframe['frequency'] = dataframe['frequencyUniqueKey'].map(
+            frequency).astype(np.float64)
+
+    def __getFrequency(self, dataframe: pd.DataFrame, frequencyOption: FrequencyOption) -> pd.Series:
+        '''
+        return a series map frequencyUniqueKey to frequency, computed from the transactions of the dataframe
+        frequency = number of transactions / number of month (or day) between the first and the last transaction of the key (both included)
+        all the keys are computed together by one aggregation and array arithmetic
+        '''
+        dateInfo = dataframe.groupby('frequencyUniqueKey', observed=True)['transactionDate'].agg([
+            'count', 'min', 'max'])
+        firstTransactionDate = dateInfo['min']
+        lastTransactionDate = dateInfo['max']
+        if frequencyOption.getPer() == 'month':
+            # reference Rooy, J. L. (2010, October 28). Answer to ‘Best way to find the months between two dates’. Stack Overflow. https://stackoverflow.com/a/4040338
+            length = (lastTransactionDate.dt.year - firstTransactionDate.dt.year) * 12 + \
+                lastTransactionDate.dt.month - firstTransactionDate.dt.month + 1
+        else:
+            length = (lastTransactionDate - firstTransactionDate).dt.days + 1
+        return dateInfo['count'] / length
 
-    def __getFrequencyOfGroup(self, dataGroup, per: Literal['month', 'day']) -> pd.Series:
+    def __getFrequencyUniqueKey(self, dataframe: pd.DataFrame, frequencyOption: FrequencyOption) -> pd.Series:
         '''
-        Helper function used for calculate frequency
+        return the frequencyUniqueKey of the transactions of the dataframe based on frequencyOption
         '''
-        # reference Rooy, J. L. (2010, October 28). Answer to ‘Best way to find the months between two dates’. Stack Overflow. https://stackoverflow.com/a/4040338
-        def getNumberOfMonth(date1, date2):
-            return (date2.year - date1.year) * 12 + date2.month - date1.month + 1
-
-        def getNumberOfDay(date1, date2):
-            return (date2 - date1).days + 1
+        frequencyUniqueKey = frequencyOption.getUniqueKey()
+        if frequencyUniqueKey in (FrequencyUniqueKey.CLUSTERED_TRANSACTION_DESCRIPTION.value, FrequencyUniqueKey.TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION.value):
+            stringClusterMap = self.__getStringClusterMap(frequencyOption)
+            return dataframe['transactionDescription'].map(stringClusterMap)
+        return dataframe[frequencyUniqueKey]
 
-        numberOfTransaction = dataGroup.shape[0]
-        firstTransactionDate = dataGroup['transactionDate'].min()
-        lastTransactionDate = dataGroup['transactionDate'].max()
-        length = getNumberOfMonth(firstTransactionDate, lastTransactionDate) if (
-            per == 'month') else getNumberOfDay(firstTransactionDate, lastTransactionDate)
-        frequency = numberOfTransaction/length
-        # assert frequency != 0
-        return pd.Series({'frequency': frequency})
+    def appendTransactions(self, newTransactions: pd.DataFrame) -> dict:
+        '''
+            this method will replace self.dataframe, the views from getView before it still have the old transactions
+            add new transactions without building the dataset again.
+            newTransactions: the columns are the cammelCase column names of the csv file: transactionNumber, transactionDate (day first string),
+            transactionType, transactionDescription, debitAmount, creditAmount, balance, category, locationCity, locationCountry
 
+            the string clusterers that have been built only compute the distances of the new transactionDescription,
+            which join the cluster of their nearest transactionDescription.
+            only the frequency of the frequencyUniqueKey of the new transactions is computed again.
+            if clusterByKMeans has been run, it is run again with the same arguments.
+            return a dictionary with the number of new transactions and new transactionDescription
+            raise ValueError if a transactionNumber already exists or a column is missing, or the transactions are shared by several processes
+        '''
+        if self.sharedDataDirectory != None:
+            raise ValueError(
+                'the transactions are shared by several processes, they can not be appended')
+        with self.dataLock:
+            return self.__appendTransactions(newTransactions)
+
+    def __appendTransactions(self, newTransactions: pd.DataFrame) -> dict:
+        requiredColumnNames = ['transactionNumber', 'transactionDate', 'transactionType', 'transactionDescription',
+                               'debitAmount', 'creditAmount', 'balance', 'category', 'locationCity', 'locationCountry']
+        missingColumnNames = [
+            columnName for columnName in requiredColumnNames if columnName not in newTransactions.columns]
+        if len(missingColumnNames) > 0:
+            raise ValueError(f'missing columns: {missingColumnNames}')
+        newTransactions = newTransactions[requiredColumnNames].copy()
+        if newTransactions['transactionNumber'].duplicated().any() or newTransactions['transactionNumber'].isin(self.dataframe['transactionNumber']).any():
+            raise ValueError('transactionNumber already exists')
+        if 'unnamed:0' in self.dataframe.columns:
+            newTransactions.insert(0, 'unnamed:0', np.arange(
+                len(self.dataframe), len(self.dataframe) + len(newTransactions)))
+        self.__cleanNewTransactions(newTransactions)
+
+        # add the new transactionDescription to the string clusterers
+        existingStringSet = set(self.uniqueStringList)
+        newStringList = sorted(
+            set(newTransactions['transactionDescription']) - existingStringSet)
+        if len(newStringList) > 0:
+            # hold all the locks, so a clusterer is either built before and gets the new strings, or built after with the new strings
+            with ExitStack() as stack:
+                for lock in list(self.linkageBasedStringClustererLocks.values()) + [self.tfidfStringClustererLock]:
+                    stack.enter_context(lock)
+                self.uniqueStringList = sorted(
+                    existingStringSet.union(newStringList))
+                for clusterer in self.linkageBasedStringClusterers.values():
+                    clusterer.addStringList(newStringList)
+                if self.tfidfStringClusterer != None:
+                    self.tfidfStringClusterer.addStringList(newStringList)
+
+        # only the frequency of the affected frequencyUniqueKey changes
+        newTransactions['frequencyUniqueKey'] = self.__getFrequencyUniqueKey(
+            newTransactions, self.frequencyOption)
+        # the new dataframe is completed before it replaces self.dataframe, because the views share the columns of self.dataframe
+        dataframe = pd.concat(
+            [self.dataframe, newTransactions], ignore_index=True)
+        # concat gives object columns when the categories are different
+        self.__setCategoricalColumnType(dataframe)
+        affectedKeySet = set(newTransactions['frequencyUniqueKey'])
+        isAffected = dataframe['frequencyUniqueKey'].isin(affectedKeySet)
+        frequency = self.__getFrequency(
+            dataframe[isAffected], self.frequencyOption)
+        dataframe.loc[isAffected, 'frequency'] = dataframe.loc[isAffected,
+                                                               'frequencyUniqueKey'].map(frequency).astype(np.float64)
+        self.dataframe = dataframe
+        self.dataVersion += 1
+
+        if self.kmeansArguments != None:
+            self.clusterByKMeans(**self.kmeansArguments)
+        return {'numberOfNewTransaction': len(newTransactions), 'numberOfNewTransactionDescription': len(newStringList)}
+
+    @stageMetrics.timed('stringClusterMap')
     def __getStringClusterMap(self, frequencyOption: FrequencyOption):
         '''
         return a dictionary map string to clusterId like this: {'save the charge': 1, 'subway': 2,...}
-        frequencyOption: should provide the information about how the linkage
+        frequencyOption: should provide the information about how the linkage, or only the numberOfCluster for tfidfClusteredTransactionDescription
         '''
-        distanceMeasure = frequencyOption.getDistanceMeasure()
-        linkageMethod = frequencyOption.getLinkageMethod()
         numberOfCluster = frequencyOption.getNumberOfCluster()
-        assert (distanceMeasure != None)
-        assert (linkageMethod != None)
         assert (numberOfCluster != None)
-
-        clusterer = self.linkageBasedStringClusterers[distanceMeasure]
-        # it should been preloaded when initialise the TransactionDataset Class
-        assert isinstance(clusterer, LinkageBasedStringCluster)
-        # get an aligned string list with unique strings an aligned clusterid, based on the linkageMethod and numberOfCluster
-        # assert their length should be the same
-        # assert the value in string list should be unique
-        # assert the value in string list should cover the value in transactionDescription Column (not implemented)
-        if clusterer.getClusterInfo()['linkageMethod'] != linkageMethod:
-            # update linkage method if need
-            clusterer.setLinkageMethod(linkageMethod)
-        clusterStringList = clusterer.getDataList()
-        clustereIdList = clusterer.getClusterIdList(numberOfCluster)
+        if frequencyOption.getUniqueKey() == FrequencyUniqueKey.TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION.value:
+            clusterer = self.getTfidfStringClusterer()
+            # addStringList replaces the strings and the vectors, so they are read together
+            with self.tfidfStringClustererLock:
+                clusterStringList = clusterer.getDataList()
+                clustereIdList = clusterer.getClusterIdList(numberOfCluster)
+        else:
+            clusterStringList, clustereIdList = self.__getLinkageClusterIdList(
+                frequencyOption)
         assert len(clusterStringList) == len(clustereIdList), 'something wrong'
         assert len(clusterStringList) == len(
             set(clusterStringList)), 'something wrong'
@@ -220,6 +578,28 @@ class TransactionDataset:
         clusterStringMap = dict(zip(clusterStringList, clustereIdList))
         return clusterStringMap
 
+    def __getLinkageClusterIdList(self, frequencyOption: FrequencyOption) -> tuple[list[str], list[int]]:
+        '''
+        return (the strings, the cluster id of each string) of the stringClusterer of the distanceMeasure of frequencyOption
+        '''
+        distanceMeasure = frequencyOption.getDistanceMeasure()
+        linkageMethod = frequencyOption.getLinkageMethod()
+        numberOfCluster = frequencyOption.getNumberOfCluster()
+        assert (distanceMeasure != None)
+        assert (linkageMethod != None)
+
+        clusterer = self.getLinkageBasedStringClusterer(distanceMeasure)
+        assert isinstance(
+            clusterer, (LinkageBasedStringCluster, BlockedSingleLinkageStringCluster))
+        # get an aligned string list with unique strings an aligned clusterid, based on the linkageMethod and numberOfCluster
+        # BlockedSingleLinkageStringCluster always uses single linkage
+        # the clusterer is shared by the views, its linkage method is only changed while holding its lock
+        with self.linkageBasedStringClustererLocks[distanceMeasure]:
+            if isinstance(clusterer, LinkageBasedStringCluster) and clusterer.getClusterInfo()['linkageMethod'] != linkageMethod:
+                # update linkage method if need
+                clusterer.setLinkageMethod(linkageMethod)
+            return clusterer.getDataList(), clusterer.getClusterIdList(numberOfCluster)
+
     def __convertColumnNameToCammelCase(self) -> bool:
         '''
             this method will mutate self.dataframe:
@@ -242,9 +622,88 @@ class TransactionDataset:
         except:
             return False
 
-    def __addTransactionAmountInfo(self):
+    def __loadDataframe(self, csvPath: str, snapshotDirectory: Union[str, None]):
+        '''
+            set self.dataframe to the cleaned transactions of the csv file,
+            read it from the snapshot of the csv file in snapshotDirectory if there is one, otherwise save the snapshot
+        '''
+        snapshotPath = None
+        if snapshotDirectory != None:
+            os.makedirs(snapshotDirectory, exist_ok=True)
+            snapshotPath = os.path.join(
+                snapshotDirectory, self.__getSnapshotKey(csvPath) + '.feather')
+            if os.path.exists(snapshotPath):
+                try:
+                    self.dataframe: pd.DataFrame = pd.read_feather(snapshotPath)
+                    return
+                except Exception as error:
+                    print(f'remove invalid snapshot {snapshotPath}: {error}')
+                    os.remove(snapshotPath)
+
+        self.dataframe: pd.DataFrame = pd.read_csv(
+            csvPath, dtype=CSV_COLUMN_TYPE)
+        self.__convertColumnNameToCammelCase()  # convert column name
+        self.__cleanNewTransactions(self.dataframe)
+
+        if snapshotPath != None:
+            # write to a temporary file first, so another process never reads a half written snapshot
+            fileDescriptor, temporaryPath = tempfile.mkstemp(
+                suffix='.feather', dir=snapshotDirectory)
+            os.close(fileDescriptor)
+            try:
+                self.dataframe.to_feather(temporaryPath)
+                os.replace(temporaryPath, snapshotPath)
+            finally:
+                if os.path.exists(temporaryPath):
+                    os.remove(temporaryPath)
+
+    def __attachSharedDataframe(self, csvPath: str, snapshotDirectory: Union[str, None], sharedDataDirectory: str):
         '''
-            this method will mutate self.dataframe:
+            set self.dataframe to the memory-mapped cleaned transactions of the csv file published in sharedDataDirectory,
+            the first process publishes them, the other processes wait for it
+        '''
+        sharedDataPath = os.path.join(
+            sharedDataDirectory, self.__getSnapshotKey(csvPath))
+        with fileLock(sharedDataPath + '.lock'):
+            if not isPublished(sharedDataPath):
+                self.__loadDataframe(csvPath, snapshotDirectory)
+                publishDataframe(self.dataframe, sharedDataPath)
+        self.dataframe = attachDataframe(sharedDataPath)
+
+    def __getSnapshotKey(self, csvPath: str) -> str:
+        '''
+            a sha256 of the content of the csv file and SNAPSHOT_VERSION, a changed csv file gets a new snapshot
+        '''
+        hasher = hashlib.sha256(str(SNAPSHOT_VERSION).encode('utf-8'))
+        with open(csvPath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def __cleanNewTransactions(self, dataframe: pd.DataFrame):
+        '''
+            this method will mutate the dataframe, its column names should have been converted to cammelCase
+        '''
+        # derive transactionAmount and isCredit column based on creditAmount and debitAmount column
+        self.__addTransactionAmountInfo(dataframe)
+        # add dayOfYear dayOfWeek weekOfYear columns, set transactionData tobe datetime type
+        self.__cleanDateInfo(dataframe)
+        # replace NaN in category column by 'unknown'
+        self.__cleanCategory(dataframe)
+        self.__setCategoricalColumnType(dataframe)
+
+    def __setCategoricalColumnType(self, dataframe: pd.DataFrame):
+        '''
+            this method will mutate the dataframe, set the type of the CATEGORICAL_COLUMN_NAMES columns to be categorical
+        '''
+        for columnName in CATEGORICAL_COLUMN_NAMES:
+            if columnName in dataframe.columns and not isinstance(dataframe[columnName].dtype, pd.CategoricalDtype):
+                dataframe[columnName] = dataframe[columnName].astype(
+                    'category')
+
+    def __addTransactionAmountInfo(self, dataframe: pd.DataFrame):
+        '''
+            this method will mutate the dataframe (self.dataframe or the new transactions):
             add the isCredit, if the creditAmount in the dataframe is na, set false, else true
             a transaction can be either be a credit transaction or a debit transaction
             add transaction Amount based on isCredit, if isCredit is true, use Credit Amount, else use Debit Amount
@@ -252,18 +711,18 @@ class TransactionDataset:
         '''
         try:
             # add isCredit: reference: https://stackoverflow.com/questions/71000585/create-a-new-column-in-pandas-dataframe-based-on-the-nan-values-in-another-col
-            self.dataframe['isCredit'] = self.dataframe['creditAmount'].isna(
+            dataframe['isCredit'] = dataframe['creditAmount'].isna(
             ) == False
             # add transaction Amount based on isCredit, if isCredit is true, use Credit Amount, else use Debit Amount
-            self.dataframe['transactionAmount'] = self.dataframe.apply(
-                lambda row: row.creditAmount if row['isCredit'] else row.debitAmount, axis=1)
+            dataframe['transactionAmount'] = dataframe['creditAmount'].where(
+                dataframe['isCredit'], dataframe['debitAmount'])
             return True
         except:
             return False
 
-    def __cleanDateInfo(self):
+    def __cleanDateInfo(self, dataframe: pd.DataFrame):
         '''
-            this method will mutate self.dataframe:
+            this method will mutate the dataframe (self.dataframe or the new transactions):
             set the transactionData column to be datetime object
             add day of year column 1 to 366
             add day of week: 1to7 1: monday, 2: tuesday...
@@ -271,35 +730,44 @@ class TransactionDataset:
             return true if successed, false if failed
         '''
         try:
-            self.dataframe['transactionDate'] = pd.to_datetime(
-                self.dataframe['transactionDate'], dayfirst=True)
-            self.dataframe['dayOfYear'] = self.dataframe['transactionDate'].dt.dayofyear
-            self.dataframe['dayOfWeek'] = self.dataframe['transactionDate'].dt.dayofweek + 1
-            self.dataframe['weekOfYear'] = self.dataframe['transactionDate'].dt.isocalendar(
+            try:
+                dataframe['transactionDate'] = pd.to_datetime(
+                    dataframe['transactionDate'], format=TRANSACTION_DATE_FORMAT)
+            except ValueError:
+                # not all the dates are like 25/07/2022, guess the format of each date
+                dataframe['transactionDate'] = pd.to_datetime(
+                    dataframe['transactionDate'], dayfirst=True)
+            dataframe['dayOfYear'] = dataframe['transactionDate'].dt.dayofyear
+            dataframe['dayOfWeek'] = dataframe['transactionDate'].dt.dayofweek + 1
+            dataframe['weekOfYear'] = dataframe['transactionDate'].dt.isocalendar(
             ).week
             return True
         except:
             return False
 
-    def __cleanCategory(self):
+    def __cleanCategory(self, dataframe: pd.DataFrame):
         '''
-            warning: mutate self.dataframe
-            assume there is 'category' column in self.dataframe
+            warning: mutate the dataframe (self.dataframe or the new transactions)
+            assume there is 'category' column in the dataframe
             replace the NaN value in the category column by the string 'unknown'
         '''
-        if 'category' not in self.getColumnNames():
+        if 'category' not in list(dataframe.columns):
             raise ValueError(
-                f"category column does not exist in {self.getColumnNames()}")
-        self.dataframe['category'].fillna('unknown', inplace=True)
+                f"category column does not exist in {list(dataframe.columns)}")
+        if isinstance(dataframe['category'].dtype, pd.CategoricalDtype) and 'unknown' not in dataframe['category'].cat.categories:
+            dataframe['category'] = dataframe['category'].cat.add_categories(
+                'unknown')
+        dataframe['category'] = dataframe['category'].fillna('unknown')
         return True
 
-    def __getNumericalDataFromCategoricalData(self, categoricalColumnName) -> pd.Series:
+    def __getNumericalDataFromCategoricalData(self, categoricalColumn: pd.Series) -> pd.Series:
         '''
-            assume categoricalColumnName exists
-            takes a name of a column with categorical data (str, datetime, boolean), and return a series with the numerical data.
+            takes a column with categorical data (str, datetime, boolean), and return a series with the numerical data.
         '''
-        numericalColumn: pd.Series = self.dataframe[categoricalColumnName].replace(set(
-            self.dataframe[categoricalColumnName]), [i for i in range(len(set(self.dataframe[categoricalColumnName])))])
+        if isinstance(categoricalColumn.dtype, pd.CategoricalDtype):
+            return categoricalColumn.cat.codes.astype(np.int64)
+        numericalColumn: pd.Series = categoricalColumn.replace(set(
+            categoricalColumn), [i for i in range(len(set(categoricalColumn)))])
         return numericalColumn
 
     def getColumn(self, columnName, toNumerical=False) -> pd.Series:
@@ -308,16 +776,19 @@ class TransactionDataset:
             if the column is categorical and toNumerical==True, return a list of number represents the category of the columnName,
             otherwise return a list of value of the columnName
         '''
-        assert columnName in self.dataframe.columns, f"{columnName} doesn't exist"
+        return self.__getColumnOfDataframe(self.dataframe, columnName, toNumerical)
+
+    def __getColumnOfDataframe(self, dataframe: pd.DataFrame, columnName, toNumerical=False) -> pd.Series:
+        assert columnName in dataframe.columns, f"{columnName} doesn't exist"
         # referenced danthelion's answer for checking numericals: https://stackoverflow.com/questions/19900202/how-to-determine-whether-a-column-variable-is-numeric-or-not-in-pandas-numpy
         isColumnCategorical = pd.api.types.is_numeric_dtype(
-            self.dataframe[columnName]) == False
+            dataframe[columnName]) == False
         if toNumerical and isColumnCategorical:
-            return self.__getNumericalDataFromCategoricalData(columnName)
+            return self.__getNumericalDataFromCategoricalData(dataframe[columnName])
         else:
-            return self.dataframe[columnName]
+            return dataframe[columnName]
 
-    def clusterByKMeans(self, metric1, metric2, numberOfCluster, maxIteration: int = 300, nInit=10):
+    def clusterByKMeans(self, metric1, metric2, numberOfCluster, maxIteration: int = 300, nInit=10, engine: KMeansEngine = KMeansEngine.EXACT, timeBudget: Union[float, None] = None):
         '''
             assume metric1 and metric2 exist in the column names.
             run KMean clustering algorithm based on the two metrics
@@ -325,18 +796,54 @@ class TransactionDataset:
             set the clusterId column to be the result of clustering algorithm
             this method will mutate self.dataframe
             maxIteration should >VALID_KMEAN_ITERATION[0] and <VALID_KMEAN_ITERATION[1]
+            the labels are cached, calling it again with the same arguments, frequency option and transactions doesn't run KMeans again
+            engine: KMeansEngine.APPROXIMATE trades some inertia for speed, it stops after timeBudget seconds (DEFAULT_APPROXIMATE_KMEANS_TIME_BUDGET by default),
+                nInit is not used, the inertia of both engines is in getKMeansInfo
+        '''
+        if engine == KMeansEngine.APPROXIMATE and timeBudget == None:
+            timeBudget = DEFAULT_APPROXIMATE_KMEANS_TIME_BUDGET
+        kmeansArguments = {'metric1': metric1, 'metric2': metric2, 'numberOfCluster': numberOfCluster,
+                           'maxIteration': maxIteration, 'nInit': nInit, 'engine': engine, 'timeBudget': timeBudget}
+        labels, self.kmeansInfo = self.__getKMeansResult(
+            self.dataframe, self.frequencyOption, self.dataVersion, **kmeansArguments)
+        self.kmeansArguments = kmeansArguments
+        # update the clusterId column
+        self.dataframe['cluster'] = labels
+        return True
+
+    @stageMetrics.timed('clusterByKMeans')
+    def __getKMeansResult(self, dataframe: pd.DataFrame, frequencyOption: FrequencyOption, dataVersion: int, metric1, metric2, numberOfCluster, maxIteration, nInit, engine, timeBudget) -> tuple[np.ndarray, dict]:
+        '''
+            return (the cluster labels, the kmeans info) of the transactions of the dataframe, see clusterByKMeans,
+            the dataframe isn't changed, its frequency columns are computed with frequencyOption and its transactions are the ones of dataVersion
         '''
-        assert metric1 in self.dataframe.columns, f"{metric1} does not exist"
-        assert metric2 in self.dataframe.columns, f"{metric2} does not exist"
+        assert metric1 in dataframe.columns, f"{metric1} does not exist"
+        assert metric2 in dataframe.columns, f"{metric2} does not exist"
         if (maxIteration < VALID_KMEAN_ITERATION[0] or maxIteration > VALID_KMEAN_ITERATION[1]):
             raise ValueError(
                 'maxIteration should <1 and >2000, given: ' + str(maxIteration))
         if (numberOfCluster < 1):
             raise ValueError(
                 'invalid number of cluster, it must be at least 1')
+        if timeBudget != None and timeBudget <= 0:
+            raise ValueError(
+                'timeBudget should be positive, given: ' + str(timeBudget))
+        if engine == KMeansEngine.APPROXIMATE and timeBudget == None:
+            timeBudget = DEFAULT_APPROXIMATE_KMEANS_TIME_BUDGET
+        # the exact result doesn't depend on the time budget
+        kmeansCacheKey = self.__getKMeansCacheKey(
+            frequencyOption, dataVersion, metric1, metric2, numberOfCluster, maxIteration, nInit, engine, timeBudget if engine == KMeansEngine.APPROXIMATE else None)
+        cachedResult = self.kmeansCache.get(kmeansCacheKey)
+        if cachedResult != None:
+            return cachedResult['labels'], self.__getKMeansInfo(
+                engine, cachedResult, 0.0, True, frequencyOption, dataVersion, metric1, metric2, numberOfCluster, maxIteration, nInit)
+        startTime = time.perf_counter()
+
         # get the numerical value of two columns
-        x1 = self.getColumn(metric1, toNumerical=True).to_numpy()
-        x2 = self.getColumn(metric2, toNumerical=True).to_numpy()
+        x1 = self.__getColumnOfDataframe(
+            dataframe, metric1, toNumerical=True).to_numpy()
+        x2 = self.__getColumnOfDataframe(
+            dataframe, metric2, toNumerical=True).to_numpy()
 
         # reference for normalise the data: https://scikit-learn.org/stable/modules/preprocessing.html#normalization
         # normalise the data so that one of the dimension won't dominant the clustering algorithm
@@ -344,19 +851,93 @@ class TransactionDataset:
         x2Norm = sklearn.preprocessing.normalize([x2])
 
         X = np.dstack((x1Norm, x2Norm))[0]  # type: ignore
-        # run kmean
-        # reference: https://scikit-learn.org/stable/modules/generated/sklearn.cluster.KMeans.html
-        kmeans = KMeans(n_clusters=numberOfCluster, random_state=0,
-                        max_iter=maxIteration, n_init=nInit).fit(X)
-        # update the clusterId column
-        self.dataframe['cluster'] = kmeans.labels_
-        return True
+        if engine == KMeansEngine.APPROXIMATE:
+            result = self.__runApproximateKMeans(
+                X, numberOfCluster, maxIteration, startTime + timeBudget)
+        else:
+            # run kmean
+            # reference: https://scikit-learn.org/stable/modules/generated/sklearn.cluster.KMeans.html
+            kmeans = KMeans(n_clusters=numberOfCluster, random_state=0,
+                            max_iter=maxIteration, n_init=nInit).fit(X)
+            result = {'labels': kmeans.labels_,
+                      'inertia': float(kmeans.inertia_), 'numberOfIteration': int(kmeans.n_iter_)}
+        self.kmeansCache.put(kmeansCacheKey, result)
+        return result['labels'], self.__getKMeansInfo(engine, result, time.perf_counter(
+        ) - startTime, False, frequencyOption, dataVersion, metric1, metric2, numberOfCluster, maxIteration, nInit)
+
+    def __runApproximateKMeans(self, X: np.ndarray, numberOfCluster: int, maxIteration: int, deadline: float) -> dict:
+        '''
+            fit MiniBatchKMeans with shuffled mini batches, until maxIteration passes over the data are done, the centers stop moving or the deadline (time.perf_counter()) is reached,
+            at least one mini batch is used. then every row is assigned to the closest center
+        '''
+        if len(X) < numberOfCluster:
+            raise ValueError(
+                f'numberOfCluster should not be more than the number of transactions {len(X)}, given: {numberOfCluster}')
+        # reference: https://scikit-learn.org/stable/modules/generated/sklearn.cluster.MiniBatchKMeans.html
+        batchSize = max(APPROXIMATE_KMEANS_BATCH_SIZE, 3 * numberOfCluster)
+        # the transaction amounts have outliers in small clusters, reassigning the small clusters to random rows would lose them
+        kmeans = MiniBatchKMeans(n_clusters=numberOfCluster, random_state=0,
+                                 batch_size=batchSize, n_init=1, reassignment_ratio=0)
+        randomGenerator = np.random.default_rng(0)
+        numberOfBatch = 0
+        numberOfIteration = 0
+        isTimeUp = False
+        while numberOfIteration < maxIteration and not isTimeUp:
+            previousCenters = None if numberOfBatch == 0 else kmeans.cluster_centers_.copy()
+            order = randomGenerator.permutation(len(X))
+            for batchStart in range(0, len(X), batchSize):
+                batch = X[order[batchStart:batchStart + batchSize]]
+                # partial_fit needs at least numberOfCluster rows, the first batch always has them, a short last batch is skipped
+                if len(batch) < numberOfCluster:
+                    continue
+                kmeans.partial_fit(batch)
+                numberOfBatch += 1
+                if time.perf_counter() >= deadline:
+                    isTimeUp = True
+                    break
+            numberOfIteration += 1
+            if previousCenters is not None and np.max(np.abs(kmeans.cluster_centers_ - previousCenters)) < APPROXIMATE_KMEANS_TOLERANCE:
+                break
+        labels = kmeans.predict(X)
+        inertia = float(
+            np.sum((X - kmeans.cluster_centers_[labels]) ** 2))
+        return {'labels': labels, 'inertia': inertia, 'numberOfIteration': numberOfIteration, 'numberOfBatch': numberOfBatch, 'isTimeUp': isTimeUp}
+
+    def __getKMeansInfo(self, engine: KMeansEngine, result: dict, elapsedTime: float, isCached: bool, frequencyOption: FrequencyOption, dataVersion: int, metric1, metric2, numberOfCluster, maxIteration, nInit) -> dict:
+        '''
+            the inertia of the exact result is added if it is in the cache, so the approximate inertia can be compared with it
+        '''
+        kmeansInfo = {'engine': engine.value, 'elapsedTime': elapsedTime, 'isCached': isCached,
+                      **{key: value for key, value in result.items() if key != 'labels'}}
+        exactResult = self.kmeansCache.peek(self.__getKMeansCacheKey(
+            frequencyOption, dataVersion, metric1, metric2, numberOfCluster, maxIteration, nInit, KMeansEngine.EXACT, None))
+        kmeansInfo['exactInertia'] = None if exactResult == None else exactResult['inertia']
+        return kmeansInfo
+
+    def __getKMeansCacheKey(self, frequencyOption: FrequencyOption, dataVersion: int, metric1, metric2, numberOfCluster, maxIteration, nInit, engine, timeBudget) -> tuple:
+        '''
+            the labels of clusterByKMeans only depend on the arguments, the frequency option (the frequency column may be a metric) and the transactions
+        '''
+        return (metric1, metric2, numberOfCluster, maxIteration, nInit, engine, timeBudget, frequencyOption.getOptionTuple(), dataVersion)
+
+    def getKMeansInfo(self) -> Union[dict, None]:
+        '''
+            return the engine, inertia, elapsedTime (seconds), isCached, numberOfIteration and exactInertia (None if the exact result is not computed yet)
+            of the last clusterByKMeans, the approximate engine also returns numberOfBatch and isTimeUp
+        '''
+        return self.kmeansInfo
+
+    def getKMeansCacheInfo(self) -> dict:
+        '''
+            return the hit, miss, size and maxSize of the cache of clusterByKMeans
+        '''
+        return self.kmeansCache.getInfo()
 
     def getClusterIdOfTransactionNumber(self) -> dict:
         '''
             if the cluster algorithm has runned return a dictionary where the key is transactionNumber and the value is the cluster.
         '''
-        return self.getDataframe()[['transactionNumber', 'cluster']].set_index('transactionNumber').to_dict(orient="index")
+        return selectColumns(self.getDataframe(), ['transactionNumber', 'cluster']).set_index('transactionNumber').to_dict(orient="index")
 
     def isValidColumnName(self, columnNameToCheck: str) -> bool:
         '''
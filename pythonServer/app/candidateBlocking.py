@@ -0,0 +1,148 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree
+from sklearn.feature_extraction.text import CountVectorizer
+
+# the strings are padded so that the strings shorter than the gram size still have grams
+GRAM_PADDING = '\x02'
+# number of rows of the rare gram matrix multiplied in one go, bounds the memory of the shared gram counts
+CANDIDATE_BLOCK_SIZE = 2000
+
+
+def getCandidatePairs(stringList: list[str], gramSize: int = 3, maxGramFrequency: int = 100, numberOfNeighbour: int = 20, sortedNeighbourWindow: int = 2) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        return (rowIndex, columnIndex) of the candidate pairs (rowIndex < columnIndex), the strings of a candidate pair share at least one character n-gram,
+        the number of pair is at most about len(stringList) * (numberOfNeighbour + number of gram per string * sortedNeighbourWindow),
+        so the memory and time grow linearly with the number of string
+
+        gramSize: the length of the character n-gram
+        maxGramFrequency: a gram shared by at most maxGramFrequency strings is rare, all the strings sharing it are compared
+        numberOfNeighbour: for each string, only keep the rare gram candidates sharing the most grams with it
+        sortedNeighbourWindow: a gram shared by more strings (like ' th') would give too many pairs, the strings sharing it are sorted,
+            and each string is only compared with the next sortedNeighbourWindow strings
+    '''
+    numberOfString = len(stringList)
+    if numberOfString < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    padding = GRAM_PADDING * (gramSize - 1)
+    paddedStringList = [padding + string + padding for string in stringList]
+    # reference: https://scikit-learn.org/stable/modules/generated/sklearn.feature_extraction.text.CountVectorizer.html
+    vectorizer = CountVectorizer(analyzer='char', ngram_range=(gramSize, gramSize), lowercase=False,
+                                 binary=True, dtype=np.int32)
+    gramMatrix = vectorizer.fit_transform(paddedStringList).tocsc()
+    gramFrequency = np.diff(gramMatrix.indptr)
+    isRareGram = gramFrequency <= maxGramFrequency
+
+    rowIndex1, columnIndex1 = _getRareGramPairs(
+        gramMatrix[:, isRareGram].tocsr(), numberOfNeighbour)
+    rowIndex2, columnIndex2 = _getFrequentGramPairs(
+        gramMatrix[:, ~isRareGram], stringList, sortedNeighbourWindow)
+    rowIndex = np.concatenate([rowIndex1, rowIndex2])
+    columnIndex = np.concatenate([columnIndex1, columnIndex2])
+    # a pair can be found several times, only keep it once with rowIndex < columnIndex
+    pairKey = np.unique(np.minimum(rowIndex, columnIndex) *
+                        numberOfString + np.maximum(rowIndex, columnIndex))
+    return pairKey // numberOfString, pairKey % numberOfString
+
+
+def _getRareGramPairs(gramMatrix: csr_matrix, numberOfNeighbour: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        return the pairs of strings sharing a gram of gramMatrix, only keep the numberOfNeighbour pairs sharing the most grams for each string
+    '''
+    numberOfString = gramMatrix.shape[0]
+    gramMatrixTransposed = gramMatrix.T.tocsr()
+    rowIndexList = [np.zeros(0, dtype=np.int64)]
+    columnIndexList = [np.zeros(0, dtype=np.int64)]
+    for rowStart in range(0, numberOfString, CANDIDATE_BLOCK_SIZE):
+        rowEnd = min(rowStart + CANDIDATE_BLOCK_SIZE, numberOfString)
+        # number of shared grams between the strings of the block and all the strings
+        sharedGramCount = (gramMatrix[rowStart:rowEnd] @
+                           gramMatrixTransposed).tocoo()
+        rowIndex = sharedGramCount.row.astype(np.int64) + rowStart
+        columnIndex = sharedGramCount.col.astype(np.int64)
+        count = sharedGramCount.data
+        isNotSelf = rowIndex != columnIndex
+        rowIndex, columnIndex, count = rowIndex[isNotSelf], columnIndex[isNotSelf], count[isNotSelf]
+        # keep the numberOfNeighbour candidates sharing the most grams of each row
+        order = np.lexsort((columnIndex, -count, rowIndex))
+        rowIndex, columnIndex = rowIndex[order], columnIndex[order]
+        rankInRow = np.arange(rowIndex.size) - \
+            np.searchsorted(rowIndex, rowIndex, side='left')
+        isKept = rankInRow < numberOfNeighbour
+        rowIndexList.append(rowIndex[isKept])
+        columnIndexList.append(columnIndex[isKept])
+    return np.concatenate(rowIndexList), np.concatenate(columnIndexList)
+
+
+def _getFrequentGramPairs(gramMatrix, stringList: list[str], sortedNeighbourWindow: int) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        for each gram of gramMatrix (csc), sort the strings sharing it, and pair each string with the next sortedNeighbourWindow strings
+    '''
+    gramMatrix = gramMatrix.tocsc()
+    stringIndex = gramMatrix.indices.astype(np.int64)
+    gramIndex = np.repeat(np.arange(gramMatrix.shape[1]), np.diff(gramMatrix.indptr))
+    stringRank = np.empty(len(stringList), dtype=np.int64)
+    stringRank[np.argsort(np.array(stringList, dtype=object), kind='stable')] = np.arange(len(stringList))
+    order = np.lexsort((stringRank[stringIndex], gramIndex))
+    stringIndex, gramIndex = stringIndex[order], gramIndex[order]
+    rowIndexList = [np.zeros(0, dtype=np.int64)]
+    columnIndexList = [np.zeros(0, dtype=np.int64)]
+    for offset in range(1, sortedNeighbourWindow + 1):
+        isSameGram = gramIndex[:-offset] == gramIndex[offset:]
+        rowIndexList.append(stringIndex[:-offset][isSameGram])
+        columnIndexList.append(stringIndex[offset:][isSameGram])
+    return np.concatenate(rowIndexList), np.concatenate(columnIndexList)
+
+
+def getSingleLinkageMatrixFromGraph(numberOfData: int, rowIndex: np.ndarray, columnIndex: np.ndarray, distance: np.ndarray) -> tuple[np.ndarray, int]:
+    '''
+        return (linkageMatrix, numberOfComponent), the linkageMatrix (same format as scipy.cluster.hierarchy.linkage) is the single linkage of the sparse graph,
+        it is computed from the minimum spanning tree of the graph.
+        if the graph has more than one connected component, the components are merged at the end with an infinite distance
+    '''
+    if numberOfData < 2:
+        return np.zeros((0, 4), dtype=np.float64), numberOfData
+    # minimum_spanning_tree ignores the edges with weight 0, so all the weights are moved up by 1
+    graph = csr_matrix((distance + 1, (rowIndex, columnIndex)),
+                       shape=(numberOfData, numberOfData))
+    spanningTree = minimum_spanning_tree(graph).tocoo()
+    edgeOrder = np.argsort(spanningTree.data, kind='stable')
+    edgeSource = spanningTree.row[edgeOrder].tolist()
+    edgeTarget = spanningTree.col[edgeOrder].tolist()
+    edgeDistance = (spanningTree.data[edgeOrder] - 1).tolist()
+
+    # union find, clusterOfRoot[root] is the id of the cluster (in the linkage matrix) of the data points under root
+    # python lists are faster than numpy arrays for the element by element access
+    parent = list(range(numberOfData))
+    clusterOfRoot = list(range(numberOfData))
+    size = [1] * numberOfData
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    linkageMatrix = np.zeros((numberOfData - 1, 4), dtype=np.float64)
+    numberOfMerge = 0
+
+    def merge(root1, root2, mergeDistance):
+        nonlocal numberOfMerge
+        linkageMatrix[numberOfMerge] = [min(clusterOfRoot[root1], clusterOfRoot[root2]), max(clusterOfRoot[root1], clusterOfRoot[root2]),
+                                        mergeDistance, size[root1] + size[root2]]
+        parent[root2] = root1
+        size[root1] += size[root2]
+        clusterOfRoot[root1] = numberOfData + numberOfMerge
+        numberOfMerge += 1
+
+    for source, target, mergeDistance in zip(edgeSource, edgeTarget, edgeDistance):
+        merge(find(source), find(target), mergeDistance)
+    numberOfComponent = numberOfData - numberOfMerge
+
+    # merge the connected components, these merges are not real
+    rootList = [node for node in range(numberOfData) if parent[node] == node]
+    for root in rootList[1:]:
+        merge(find(rootList[0]), root, np.inf)
+    return linkageMatrix, numberOfComponent
@@ -0,0 +1,46 @@
+from enum import Enum
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import Response
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+class ResponseFormat(Enum):
+    # a list of {columnName: value}, one dict per row
+    RECORDS = 'records'
+    # {columnName: [value of each row]}, the column names are written once
+    COLUMNS = 'columns'
+    # an arrow IPC stream, the categorical columns are sent as dictionaries
+    ARROW = 'arrow'
+
+
+def getDataframeResponse(dataframe: pd.DataFrame, responseFormat: ResponseFormat = ResponseFormat.RECORDS) -> Response:
+    '''
+        return a response with the dataframe serialised once, the dates are milliseconds since epoch in the json formats, like json.loads(dataframe.to_json(orient='records'))
+        the response is returned as it is by FastAPI, so it is not parsed back and encoded again
+    '''
+    if responseFormat == ResponseFormat.ARROW:
+        return Response(content=getArrowStream(dataframe), media_type=ARROW_STREAM_MEDIA_TYPE)
+    if responseFormat == ResponseFormat.COLUMNS:
+        return Response(content=getColumnarJson(dataframe), media_type='application/json')
+    return Response(content=dataframe.to_json(orient='records'), media_type='application/json')
+
+
+def getColumnarJson(dataframe: pd.DataFrame) -> str:
+    '''
+        return {columnName: [value of each row]} as a json string, each column is written by pandas in one go
+    '''
+    # a column name is a json string, to_json escapes it
+    return '{' + ','.join(pd.Series([columnName]).to_json(orient='values')[1:-1] + ':' + dataframe[columnName].to_json(orient='values')
+                          for columnName in dataframe.columns) + '}'
+
+
+def getArrowStream(dataframe: pd.DataFrame) -> bytes:
+    # reference: https://arrow.apache.org/docs/python/ipc.html#using-streams
+    table = pa.Table.from_pandas(dataframe, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
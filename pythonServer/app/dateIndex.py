@@ -0,0 +1,49 @@
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+
+class SortedDateIndex:
+    '''
+    The row positions of a dataframe sorted by (date, row position), so a date range is found by binary search instead of scanning every row.
+    The rows are only added at the end of the dataframe, so a (date, row position) pair keeps its place in the order and can be used as a cursor.
+
+    Attributes:
+        date (np.ndarray): the date (int64 nanoseconds) of each row
+        order (np.ndarray): the row positions sorted by (date, row position)
+        sortedDate (np.ndarray): the date (int64 nanoseconds) of each row of order
+
+    Behaviors:
+        getRange (startDate, endDate, after): return the row positions (in order) with startDate <= date < endDate, after the (date, row position) pair after
+        getCursor (position): return the (date, row position) pair of a row
+    '''
+
+    def __init__(self, dateColumn: pd.Series):
+        self.date = dateColumn.to_numpy(dtype='datetime64[ns]').view(np.int64)
+        # a stable sort keeps the rows of the same date by row position
+        self.order = np.argsort(self.date, kind='stable')
+        self.sortedDate = self.date[self.order]
+
+    def getRange(self, startDate: Union[pd.Timestamp, None] = None, endDate: Union[pd.Timestamp, None] = None, after: Union[tuple[int, int], None] = None) -> np.ndarray:
+        '''
+            return the row positions sorted by (date, row position) with startDate <= date < endDate, None means no limit,
+            after: only return the rows after this (date, row position) pair
+        '''
+        start = 0 if startDate == None else int(np.searchsorted(
+            self.sortedDate, startDate.value, side='left'))
+        end = self.sortedDate.size if endDate == None else int(np.searchsorted(
+            self.sortedDate, endDate.value, side='left'))
+        if after != None:
+            afterDate, afterPosition = after
+            # the rows of afterDate are sorted by row position
+            sameDateStart = int(np.searchsorted(
+                self.sortedDate, afterDate, side='left'))
+            sameDateEnd = int(np.searchsorted(
+                self.sortedDate, afterDate, side='right'))
+            start = max(start, sameDateStart + int(np.searchsorted(
+                self.order[sameDateStart:sameDateEnd], afterPosition, side='right')))
+        return self.order[start:max(start, end)]
+
+    def getCursor(self, position: int) -> tuple[int, int]:
+        return int(self.date[position]), int(position)
@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class DendrogramCutIndex:
+    '''
+    An index of a linkage matrix that returns the cluster id of every data point for any number of cluster k,
+    without searching a distance threshold.
+
+    Cutting the dendrogram into k clusters is the same as applying the first n-k merges of the linkage matrix.
+    The index stores the ancestors of every node at distance 1, 2, 4, 8... (binary lifting), so finding the
+    highest ancestor created by the first n-k merges takes log(n) numpy steps for all the data points.
+
+    Attributes:
+        numberOfData (int): the number of data points n, the linkage matrix has n-1 rows
+        mergeHeight (np.ndarray): the distance of each merge
+        ancestorTable (np.ndarray): ancestorTable[j][node] is the 2^j-th ancestor of node, the root is its own ancestor
+        mergeIndex (np.ndarray): mergeIndex[node] is the row of the linkage matrix that creates node, -1 for the data points
+
+    Behaviors:
+        getClusterIdList (targetNumberOfCluster): return the cluster id (1 to k) of every data point
+        getCutHeight (targetNumberOfCluster): return a distance threshold that gives exactly k clusters, or None if there isn't one
+    '''
+
+    def __init__(self, linkageMatrix: np.ndarray):
+        linkageMatrix = np.asarray(linkageMatrix)
+        self.numberOfData = linkageMatrix.shape[0] + 1
+        self.mergeHeight = linkageMatrix[:, 2].astype(np.float64)
+        numberOfNode = 2 * self.numberOfData - 1
+
+        # the merge i creates the node n+i from the two nodes in linkageMatrix[i, 0:2]
+        parent = np.arange(numberOfNode, dtype=np.int64)
+        mergedNode = linkageMatrix[:, :2].astype(np.int64)
+        createdNode = np.arange(self.numberOfData, numberOfNode, dtype=np.int64)
+        parent[mergedNode[:, 0]] = createdNode
+        parent[mergedNode[:, 1]] = createdNode
+
+        self.mergeIndex = np.concatenate(
+            [np.full(self.numberOfData, -1, dtype=np.int64), np.arange(self.numberOfData - 1, dtype=np.int64)])
+
+        ancestorTable = [parent]
+        for _ in range(max(1, int(np.ceil(np.log2(numberOfNode))))):
+            ancestorTable.append(ancestorTable[-1][ancestorTable[-1]])
+        self.ancestorTable = np.stack(ancestorTable)
+
+    def getClusterIdList(self, targetNumberOfCluster: int) -> np.ndarray:
+        '''
+        return the cluster id (1 to k) of every data point when the dendrogram is cut into exactly k clusters,
+        targetNumberOfCluster is limited to 1 to n
+        '''
+        targetNumberOfCluster = min(
+            max(1, targetNumberOfCluster), self.numberOfData)
+        numberOfMerge = self.numberOfData - targetNumberOfCluster
+        # climb from every data point to its highest ancestor created by the first numberOfMerge merges,
+        # the merge index only increases when climbing, so try the longest jump first
+        node = np.arange(self.numberOfData, dtype=np.int64)
+        for ancestor in self.ancestorTable[::-1]:
+            candidate = ancestor[node]
+            canClimb = self.mergeIndex[candidate] < numberOfMerge
+            node = np.where(canClimb, candidate, node)
+        _, clusterId = np.unique(node, return_inverse=True)
+        return clusterId + 1
+
+    def getCutHeight(self, targetNumberOfCluster: int):
+        '''
+        return a distance threshold t so that fcluster(linkageMatrix, t, 'distance') gives exactly k clusters,
+        return None if there isn't one, because several merges have the same height or the heights are not monotonic
+        '''
+        if not 1 <= targetNumberOfCluster <= self.numberOfData:
+            return None
+        numberOfMerge = self.numberOfData - targetNumberOfCluster
+        if np.any(np.diff(self.mergeHeight) < 0):
+            return None
+        if numberOfMerge == 0:
+            return None if self.mergeHeight.size == 0 or self.mergeHeight[0] <= 0 else 0.0
+        if numberOfMerge == self.numberOfData - 1:
+            return float(self.mergeHeight[-1])
+        if self.mergeHeight[numberOfMerge - 1] < self.mergeHeight[numberOfMerge]:
+            return float(self.mergeHeight[numberOfMerge - 1])
+        return None
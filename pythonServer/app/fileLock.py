@@ -0,0 +1,64 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # on windows (no fcntl), the processes are not synchronised, they may do the same work, the files are still written atomically
+    fcntl = None
+
+
+@contextmanager
+def fileLock(path: str):
+    '''
+        hold an exclusive lock on the file at path across processes, the file is created if it doesn't exist
+        the lock file can be removed by removeUnusedLockFile, so after the lock is taken, it is taken again if the file at path isn't the locked file anymore
+        reference: https://docs.python.org/3/library/fcntl.html#fcntl.flock
+    '''
+    if fcntl == None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    while True:
+        file = open(path, 'a')
+        fcntl.flock(file, fcntl.LOCK_EX)
+        if isSameFile(file, path):
+            break
+        file.close()
+    try:
+        yield
+    finally:
+        fcntl.flock(file, fcntl.LOCK_UN)
+        file.close()
+
+
+def removeUnusedLockFile(path: str) -> bool:
+    '''
+        remove the lock file at path if no process holds its lock, return True if it is removed.
+        a process waiting for the removed file locks the new file at path instead, see fileLock
+    '''
+    if fcntl == None:
+        return False
+    try:
+        file = open(path, 'a')
+    except OSError:
+        return False
+    with file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        try:
+            if not isSameFile(file, path):
+                return False
+            os.remove(path)
+            return True
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def isSameFile(file, path: str) -> bool:
+    try:
+        return os.path.samestat(os.fstat(file.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
@@ -0,0 +1,225 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Union
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobResult:
+    '''
+    The serialised result of a job, the JobQueue bounds the total size of the results it keeps by the size of their content.
+
+    Attributes:
+        content (bytes): the serialised result
+        mediaType (str): the media type of content, like 'application/json'
+        headers (dict): the headers returned with content
+    '''
+
+    def __init__(self, content: bytes, mediaType: str, headers: Union[dict, None] = None):
+        self.content = content
+        self.mediaType = mediaType
+        self.headers = headers if headers != None else {}
+
+    def getSize(self) -> int:
+        return len(self.content)
+
+
+class Job:
+    '''
+    A function submitted to a JobQueue.
+
+    Attributes:
+        jobId (str): the id given to the client
+        kind (str): what the job computes, like 'kmean'
+        status (str): 'queued', 'running', 'done', 'failed' or 'cancelled'
+        result (Any): the return value of the function when the status is 'done', None when it is expired
+        error (str): the error message when the status is 'failed'
+        isCancelRequested (bool): the job was cancelled while it was running, its result will be dropped
+        isCommitted (bool): the job has run its side effect with runUnlessCancelled, it can't be cancelled anymore
+        isResultExpired (bool): the result has been dropped to keep the results of the newer jobs, see JobQueue.maxResultSize
+
+    Behaviors:
+        getStatus: return the status of the job as a dict, without the result
+    '''
+
+    def __init__(self, kind: str):
+        self.jobId = uuid.uuid4().hex
+        self.kind = kind
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.isCancelRequested = False
+        self.isCommitted = False
+        self.isResultExpired = False
+        self.submittedTime = time.time()
+        self.startedTime = None
+        self.finishedTime = None
+        self.future: Union[Future, None] = None
+
+    def isFinished(self) -> bool:
+        return self.status in ['done', 'failed', 'cancelled']
+
+    def getStatus(self) -> dict:
+        return {'jobId': self.jobId, 'kind': self.kind, 'status': self.status, 'error': self.error, 'isResultExpired': self.isResultExpired,
+                'submittedTime': self.submittedTime, 'startedTime': self.startedTime, 'finishedTime': self.finishedTime}
+
+
+class JobQueue:
+    '''
+    Run functions in a bounded thread pool, the client gets a job id back and asks for the status and the result later.
+
+    Attributes:
+        numberOfWorker (int): the number of jobs running at the same time
+        maxQueueDepth (int): the maximum number of queued and running jobs, submit raises JobQueueFullError above it
+        maxFinishedJob (int): the number of finished jobs kept for the clients, the oldest ones are forgotten
+        maxResultSize (int): the maximum total size in bytes of the JobResult kept for the clients, the results of the oldest jobs are dropped above it
+
+    Behaviors:
+        submit (kind, function): return the Job running function(job)
+        runUnlessCancelled (job, function): run function() unless the job is cancelled, then the job can't be cancelled anymore
+        getJob (jobId): return the Job or None
+        wait (jobId, timeout): wait at most timeout seconds for the job to finish, return the Job or None
+        cancel (jobId): cancel a queued job, a running job can't be stopped, it is marked as cancelled and its result is dropped,
+            a job which has run its side effect with runUnlessCancelled isn't cancelled
+        getInfo: return the number of queued, running and finished jobs
+        getFinishedJobCount: return the number of jobs finished with each status since the queue is created
+    '''
+
+    def __init__(self, numberOfWorker: int = 1, maxQueueDepth: int = 16, maxFinishedJob: int = 100, maxResultSize: int = 256 * 1024 ** 2):
+        if numberOfWorker < 1 or maxQueueDepth < 1 or maxFinishedJob < 1:
+            raise ValueError(
+                f'numberOfWorker, maxQueueDepth and maxFinishedJob should be at least 1, given: {numberOfWorker}, {maxQueueDepth}, {maxFinishedJob}')
+        self.numberOfWorker = numberOfWorker
+        self.maxQueueDepth = maxQueueDepth
+        self.maxFinishedJob = maxFinishedJob
+        self.maxResultSize = maxResultSize
+        # reference: https://docs.python.org/3/library/concurrent.futures.html#threadpoolexecutor
+        self.executor = ThreadPoolExecutor(
+            max_workers=numberOfWorker, thread_name_prefix='job')
+        self.unfinishedJobs: dict[str, Job] = {}
+        self.finishedJobs: OrderedDict[str, Job] = OrderedDict()
+        # status -> the number of jobs finished with it since the queue is created, finishedJobs forgets the old jobs
+        self.finishedJobCount = {'done': 0, 'failed': 0, 'cancelled': 0}
+        # the total size of the JobResult of finishedJobs
+        self.resultSize = 0
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, function: Callable[[Job], Any]) -> Job:
+        '''
+            function gets its job, so it can run its side effect with runUnlessCancelled, it should return a JobResult to bound the memory of the results
+        '''
+        job = Job(kind)
+        with self.lock:
+            if len(self.unfinishedJobs) >= self.maxQueueDepth:
+                raise JobQueueFullError(
+                    f'there are already {len(self.unfinishedJobs)} queued or running jobs, try again later')
+            # the future is set before the job can be seen by getJob, wait and cancel, __runJob waits for the lock in its own thread
+            job.future = self.executor.submit(self.__runJob, job, function)
+            self.unfinishedJobs[job.jobId] = job
+        return job
+
+    def __runJob(self, job: Job, function: Callable[[Job], Any]):
+        with self.lock:
+            if job.status == 'cancelled':
+                return
+            job.status = 'running'
+            job.startedTime = time.time()
+        try:
+            result = function(job)
+            error = None
+        except Exception as exception:
+            result = None
+            error = f'{type(exception).__name__}: {exception}'
+        with self.lock:
+            if job.isCancelRequested:
+                job.status = 'cancelled'
+            elif error != None:
+                job.status, job.error = 'failed', error
+            else:
+                job.status, job.result = 'done', result
+            self.__finishJob(job)
+
+    def __finishJob(self, job: Job):
+        '''
+            move the job to finishedJobs, assume the lock is held
+            the oldest jobs are forgotten above maxFinishedJob, the results of the oldest jobs are dropped above maxResultSize
+        '''
+        job.finishedTime = time.time()
+        self.finishedJobCount[job.status] += 1
+        self.unfinishedJobs.pop(job.jobId, None)
+        self.finishedJobs[job.jobId] = job
+        self.resultSize += getResultSize(job.result)
+        while len(self.finishedJobs) > self.maxFinishedJob:
+            _, oldJob = self.finishedJobs.popitem(last=False)
+            self.resultSize -= getResultSize(oldJob.result)
+        for oldJob in self.finishedJobs.values():
+            if self.resultSize <= self.maxResultSize or oldJob is job:
+                break
+            if oldJob.result != None:
+                self.resultSize -= getResultSize(oldJob.result)
+                oldJob.result = None
+                oldJob.isResultExpired = True
+
+    def runUnlessCancelled(self, job: Job, function: Callable[[], Any]) -> bool:
+        '''
+            run function() unless the job has been cancelled, return True if it is run.
+            the check and function() hold the lock, so a cancel either comes before and function() isn't run, or after and the job isn't cancelled,
+            function() should be short, like publishing a result
+        '''
+        with self.lock:
+            if job.isCancelRequested:
+                return False
+            job.isCommitted = True
+            function()
+            return True
+
+    def getJob(self, jobId: str) -> Union[Job, None]:
+        with self.lock:
+            return self.unfinishedJobs.get(jobId) or self.finishedJobs.get(jobId)
+
+    def wait(self, jobId: str, timeout: float) -> Union[Job, None]:
+        job = self.getJob(jobId)
+        if job == None or job.isFinished():
+            return job
+        try:
+            job.future.exception(timeout=timeout)
+        except Exception:
+            # timed out or the future is cancelled, the status tells which one
+            pass
+        return job
+
+    def cancel(self, jobId: str) -> Union[Job, None]:
+        with self.lock:
+            job = self.unfinishedJobs.get(jobId) or self.finishedJobs.get(jobId)
+            if job == None or job.isFinished():
+                return job
+            if job.status == 'queued':
+                job.status = 'cancelled'
+                job.future.cancel()
+                self.__finishJob(job)
+            elif not job.isCommitted:
+                job.isCancelRequested = True
+            return job
+
+    def getInfo(self) -> dict:
+        with self.lock:
+            numberOfRunningJob = sum(
+                job.status == 'running' for job in self.unfinishedJobs.values())
+            return {'queued': len(self.unfinishedJobs) - numberOfRunningJob, 'running': numberOfRunningJob,
+                    'finished': len(self.finishedJobs), 'maxQueueDepth': self.maxQueueDepth}
+
+    def getFinishedJobCount(self) -> dict:
+        '''
+            return the number of jobs done, failed and cancelled since the queue is created
+        '''
+        with self.lock:
+            return dict(self.finishedJobCount)
+
+
+def getResultSize(result: Any) -> int:
+    return result.getSize() if isinstance(result, JobResult) else 0
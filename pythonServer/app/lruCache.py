@@ -0,0 +1,69 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    '''
+    A thread safe dictionary with at most maxSize items, the least recently used item is removed when it is full.
+
+    Attributes:
+        maxSize (int): the maximum number of items
+        hit (int): the number of get that found the key
+        miss (int): the number of get that didn't find the key
+
+    Behaviors:
+        get (key): return the value of the key or None, count a hit or a miss
+        put (key, value): add or update the item, remove the least recently used item if it is full
+        peek (key): return the value of the key or None, without counting a hit or a miss or changing the order
+        keys: return the keys from the least to the most recently used
+        getInfo: return the hit, miss, size and maxSize
+    '''
+
+    def __init__(self, maxSize: int):
+        if maxSize < 1:
+            raise ValueError('maxSize should be at least 1, given: ' + str(maxSize))
+        self.maxSize = maxSize
+        self.hit = 0
+        self.miss = 0
+        self.items: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            if key not in self.items:
+                self.miss += 1
+                return None
+            self.hit += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def peek(self, key: Hashable) -> Any:
+        with self.lock:
+            return self.items.get(key)
+
+    def put(self, key: Hashable, value: Any):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxSize:
+                self.items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        # doesn't count a hit or a miss, and doesn't change the order
+        with self.lock:
+            return key in self.items
+
+    def keys(self) -> list:
+        with self.lock:
+            return list(self.items.keys())
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def getInfo(self) -> dict:
+        return {'hit': self.hit, 'miss': self.miss, 'size': len(self.items), 'maxSize': self.maxSize}
@@ -1,17 +1,27 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+import pandas as pd
 
-from app.TransactionDataset import TransactionDataset, FrequencyOption, FrequencyUniqueKey, DistanceMeasure, LinkageMethod
+from app.TransactionDataset import TransactionDataset, FrequencyOption, FrequencyUniqueKey, DistanceMeasure, LinkageMethod, KMeansEngine
 
 from typing import Literal, Union
-import json
+from datetime import date
 import os
+import threading
 
 from app.TransactionDataset import VALID_KMEAN_ITERATION
 from app.TransactionDataset import VALID_KMEAN_N_INIT
+from app.jobQueue import Job, JobQueue, JobQueueFullError, JobResult
+from app.dataframeResponse import ResponseFormat, getDataframeResponse
+from app.stageMetrics import stageMetrics, PROMETHEUS_TEXT_MEDIA_TYPE
 
 DEFAULT_KMEAN_MAX_ITERATION = 2000
 DEFAULT_KMEAN_N_INIT = 100
+# the maximum number of seconds GET /jobs/{jobId} waits for a job
+MAX_JOB_WAIT = 30
 # start server app
 app = FastAPI()
 
@@ -24,12 +34,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # let the frontend read the headers of the responses
+    expose_headers=['X-Dataset-Version', 'X-Next-Cursor', 'X-KMean-Engine', 'X-KMean-Inertia',
+                    'X-KMean-Exact-Inertia', 'X-KMean-Elapsed-Time'],
 )
 print('server starting')
 # initialise the dataset
+# the distance matrices and linkage matrices are cached in this folder, set MATRIX_CACHE_DIRECTORY to change it,
+# the least recently used matrices are removed when they take more than MATRIX_CACHE_MAX_SIZE_MB megabytes or haven't been used for 30 days
+# the distance matrices are computed by STRING_DISTANCE_WORKER threads (processes for the large MatchRatingApproach matrices), all the cpu cores by default
+# the cleaned transactions are saved in SNAPSHOT_DIRECTORY, the next start reads the snapshot instead of the csv file
+# set PRECOMPUTE_LINKAGE_METHODS=1 to compute the linkage matrices of every linkage method in the background after the string clusterers are built
+# set SHARED_DATA_DIRECTORY when running several workers (uvicorn --workers), they memory-map the same transactions and matrices instead of loading their own copies
 transactionDataset = TransactionDataset(
-    os.getcwd()+'''/data/transaction_cleanedtest.csv''')
+    os.getcwd()+'''/data/transaction_cleanedtest.csv''',
+    matrixCacheDirectory=os.environ.get(
+        'MATRIX_CACHE_DIRECTORY', os.getcwd()+'/matrixCache'),
+    matrixCacheMaxSize=int(os.environ.get('MATRIX_CACHE_MAX_SIZE_MB', 4096)) * 1024 ** 2,
+    numberOfStringDistanceWorker=int(os.environ.get(
+        'STRING_DISTANCE_WORKER', os.cpu_count() or 1)),
+    snapshotDirectory=os.environ.get('SNAPSHOT_DIRECTORY', os.getcwd()+'/snapshot'),
+    sharedDataDirectory=os.environ.get('SHARED_DATA_DIRECTORY'),
+    precomputeLinkageMethods=os.environ.get('PRECOMPUTE_LINKAGE_METHODS', '0') == '1')
 print(transactionDataset.getDataframe())
+# the clustering endpoints and the jobs compute their own view of the dataset, they run at the same time,
+# adding and reading the transactions don't, because the date index of getTransactions is built from the current transactions
+transactionDatasetLock = threading.Lock()
+# the long clustering requests can be run as jobs, JOB_WORKER jobs run at the same time and at most JOB_QUEUE_DEPTH jobs are queued or running,
+# the results of the finished jobs take at most JOB_RESULT_MAX_SIZE_MB megabytes, the oldest ones are dropped above it
+jobQueue = JobQueue(numberOfWorker=int(os.environ.get('JOB_WORKER', 1)),
+                    maxQueueDepth=int(os.environ.get('JOB_QUEUE_DEPTH', 16)),
+                    maxResultSize=int(os.environ.get('JOB_RESULT_MAX_SIZE_MB', 256)) * 1024 ** 2)
+# the gauges of GET /metrics, they are only read when the metrics are scraped
+stageMetrics.registerCounter('kmeans_cache_hit', 'the number of kmean results found in the cache',
+                             lambda: [({}, transactionDataset.getKMeansCacheInfo()['hit'])])
+stageMetrics.registerCounter('kmeans_cache_miss', 'the number of kmean results not found in the cache',
+                             lambda: [({}, transactionDataset.getKMeansCacheInfo()['miss'])])
+stageMetrics.registerGauge('kmeans_cache_size', 'the number of kmean results in the cache',
+                           lambda: [({}, transactionDataset.getKMeansCacheInfo()['size'])])
+stageMetrics.registerGauge('kmeans_cache_max_size', 'the maximum number of kmean results in the cache',
+                           lambda: [({}, transactionDataset.getKMeansCacheInfo()['maxSize'])])
+stageMetrics.registerGauge('string_clusterer_ready', '1 if the string clusterer of the distance metric is built',
+                           lambda: [({'distanceMeasure': name}, isReady) for name, isReady in transactionDataset.getStringClustererReadiness().items()])
+stageMetrics.registerGauge('job_queue_jobs', 'the number of queued and running jobs',
+                           lambda: [({'status': status}, jobQueue.getInfo()[status]) for status in ['queued', 'running']])
+stageMetrics.registerGauge('job_queue_max_depth', 'the maximum number of queued and running jobs',
+                           lambda: [({}, jobQueue.maxQueueDepth)])
+stageMetrics.registerCounter('job_queue_finished_jobs', 'the number of jobs finished with each status',
+                             lambda: [({'status': status}, count) for status, count in jobQueue.getFinishedJobCount().items()])
+stageMetrics.registerGauge('dataset_version', 'increased when transactions are added',
+                           lambda: [({}, transactionDataset.getDataVersion())])
+
+
+# build the string clusterers in background, so the server doesn't wait for them before serving requests
+@app.on_event("startup")
+def warmUpStringClusterers():
+    threading.Thread(
+        target=transactionDataset.warmUpStringClusterers, daemon=True).start()
 
 
 # testing
@@ -37,30 +98,54 @@ print(transactionDataset.getDataframe())
 def read_root():
     return {"Hello": "World"}
 
-# get the transaction
+# check which distance metric is ready for clustering transactionDescription, the others will be built on first use
 
 
-@app.get("/transactionData")
-def getTransactionData():
-    return json.loads(transactionDataset.getDataframe().to_json(orient='records'))
+@app.get("/readiness")
+def getReadiness():
+    stringClustererReadiness = transactionDataset.getStringClustererReadiness()
+    return {'ready': all(stringClustererReadiness.values()), 'stringClusterer': stringClustererReadiness}
 
-# update the frequency unique key config, mean while update the cluster information, return the transaction dataset with cluster id column.
+# hit and miss of the cached results
 
 
-@app.get("/transactionData/updateFrequencyInfo")
-def updateUniqueKey(frequencyUniqueKey: FrequencyUniqueKey,  per: Literal['month', 'day'], metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT, distanceMeasure: Union[DistanceMeasure, None] = None, linkageMethod: Union[LinkageMethod, None] = None, numberOfClusterForString: Union[int, None] = None):
+@app.get("/cacheInfo")
+def getCacheInfo():
+    return {'kmeans': transactionDataset.getKMeansCacheInfo(), 'linkage': transactionDataset.getLinkageCacheInfo()}
+
+# the duration histograms of the stages of the pipeline and the cache sizes, in the Prometheus text format
+
+
+@app.get("/metrics")
+def getMetrics():
+    return Response(content=stageMetrics.getPrometheusText(), media_type=PROMETHEUS_TEXT_MEDIA_TYPE)
+
+# the engine, inertia and elapsed time of the last kmean clustering
+
+
+@app.get("/transactionData/kmeanInfo")
+def getKMeanInfo():
+    return transactionDataset.getKMeansInfo()
+
+
+def setKMeanInfoHeaders(response: Response, kmeansInfo: dict):
     '''
-        maxIteration should >VALID_KMEAN_ITERATION[0] and <VALID_KMEAN_ITERATION[1]
+        the kmean endpoints return the transactions, so the inertia is reported in the headers
+        the numbers are written as floats, a header is left out when its value is None, like X-KMean-Exact-Inertia when the exact result isn't computed yet
     '''
-    # update the frequencyUniqueKey, and return the transaction data
-    if (frequencyUniqueKey == FrequencyUniqueKey.CLUSTERED_TRANSACTION_DESCRIPTION) and (distanceMeasure == None or linkageMethod == None or numberOfClusterForString == None):
-        raise HTTPException(
-            status_code=404, detail=f"frequencyUnique key is clusteredTransactionDescription, so distanceMeasure, linkagemethod and numberOfClusterForString must be provided")
+    response.headers['X-KMean-Engine'] = kmeansInfo['engine']
+    for header, name in [('X-KMean-Inertia', 'inertia'), ('X-KMean-Exact-Inertia', 'exactInertia'), ('X-KMean-Elapsed-Time', 'elapsedTime')]:
+        if kmeansInfo[name] != None:
+            response.headers[header] = repr(float(kmeansInfo[name]))
 
-    # check metrics and clusterByKmeans
+
+def checkKMeanParameters(metric1: str, metric2: str, kmeanMaxIteration: int, kmeanNInit: int, kmeanTimeBudget: Union[float, None]):
     if kmeanMaxIteration < VALID_KMEAN_ITERATION[0] or kmeanMaxIteration > VALID_KMEAN_ITERATION[1]:
         raise HTTPException(
             status_code=404, detail=f"invalid kmeanMaxIteration, it should between {VALID_KMEAN_ITERATION[0]} AND {VALID_KMEAN_ITERATION[1]}, but actual: {kmeanMaxIteration}")
+    if kmeanNInit < VALID_KMEAN_N_INIT[0] or kmeanNInit > VALID_KMEAN_N_INIT[1]:
+        raise HTTPException(
+            status_code=404, detail=f"invalid kmeanNInit, it should between {VALID_KMEAN_N_INIT[0]} AND {VALID_KMEAN_N_INIT[1]}, but actual: {kmeanNInit}")
     if transactionDataset.isValidColumnName(metric1) == False:
         # reference for error http handling: https://fastapi.tiangolo.com/tutorial/handling-errors/#:~:text=When%20a%20request%20contains%20invalid,to%20decorate%20the%20exception%20handler.
         raise HTTPException(
@@ -68,42 +153,250 @@ def updateUniqueKey(frequencyUniqueKey: FrequencyUniqueKey,  per: Literal['month
     if transactionDataset.isValidColumnName(metric2) == False:
         raise HTTPException(
             status_code=404, detail=f"{metric2} is invalid, only support {str(transactionDataset.getColumnNames())}")
-    if kmeanNInit < VALID_KMEAN_N_INIT[0] or kmeanNInit > VALID_KMEAN_N_INIT[1]:
+    if kmeanTimeBudget != None and kmeanTimeBudget <= 0:
         raise HTTPException(
-            status_code=404, detail=f"invalid kmeanNInit, it should between {VALID_KMEAN_N_INIT[0]} AND {VALID_KMEAN_N_INIT[1]}, but actual: {kmeanNInit}")
+            status_code=404, detail=f"invalid kmeanTimeBudget, it should be positive, but actual: {kmeanTimeBudget}")
 
+# get the transaction
+
+
+@app.get("/transactionData")
+def getTransactionData(responseFormat: ResponseFormat = ResponseFormat.RECORDS, column: Union[list[str], None] = Query(default=None), startDate: Union[date, None] = None, endDate: Union[date, None] = None,
+                       category: Union[list[str], None] = Query(default=None), cluster: Union[list[int], None] = Query(default=None), cursor: Union[str, None] = None, limit: Union[int, None] = None):
+    '''
+        responseFormat: records (a list of rows), columns (a list of values per column) or arrow (an arrow IPC stream)
+        the X-Dataset-Version header tells which transactions are returned, see changedColumnsOnly of updateFrequencyInfo
+        column, category, cluster: only return these columns, the transactions of these categories and clusters, repeat the parameter for several values like column=a&column=b
+        startDate, endDate: only return the transactions between the two dates (both included), like 2022-07-25
+        limit: return at most limit transactions, if there are more, the X-Next-Cursor header is the cursor parameter of the next page
+        without any of these parameters all the transactions are returned in their original order, otherwise they are sorted by transactionDate
+    '''
+    with transactionDatasetLock:
+        nextCursor = None
+        if column == None and startDate == None and endDate == None and category == None and cluster == None and cursor == None and limit == None:
+            transactions = transactionDataset.getDataframe()
+        else:
+            try:
+                transactions, nextCursor = transactionDataset.getTransactions(column, None if startDate == None else pd.Timestamp(startDate),
+                                                                              None if endDate == None else pd.Timestamp(endDate) + pd.Timedelta(days=1), category, cluster, cursor, limit)
+            except ValueError as error:
+                raise HTTPException(status_code=404, detail=str(error))
+        response = getDataframeResponse(transactions, responseFormat)
+        response.headers['X-Dataset-Version'] = str(
+            transactionDataset.getDataVersion())
+        if nextCursor != None:
+            response.headers['X-Next-Cursor'] = nextCursor
+        return response
+
+# add new transactions, only the new transactionDescription and the affected frequency are computed
+
+
+class NewTransaction(BaseModel):
+    '''
+        a transaction with the same fields as a row of the csv file, transactionDate is day first like 25/07/2022
+    '''
+    transactionNumber: int
+    transactionDate: str
+    transactionType: str
+    transactionDescription: str
+    debitAmount: Union[float, None] = None
+    creditAmount: Union[float, None] = None
+    balance: float
+    category: Union[str, None] = None
+    locationCity: str
+    locationCountry: str
+
+
+@app.post("/transactionData")
+def appendTransactionData(newTransactions: list[NewTransaction]):
+    try:
+        with transactionDatasetLock:
+            return transactionDataset.appendTransactions(pd.DataFrame([newTransaction.dict() for newTransaction in newTransactions]))
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error))
+
+# update the frequency unique key config, mean while update the cluster information, return the transaction dataset with cluster id column.
+
+
+def publishView(view, job: Union[Job, None] = None) -> bool:
+    '''
+        publish the view, unless the job running it has been cancelled, return True if it is published
+    '''
+    if job == None:
+        transactionDataset.publishView(view)
+        return True
+    return jobQueue.runUnlessCancelled(job, lambda: transactionDataset.publishView(view))
+
+
+def toJobResult(response: Response) -> JobResult:
+    # only the body and the headers set by the endpoint are kept, not the response
+    return JobResult(response.body, response.media_type, {name: value for name, value in response.headers.items() if name.startswith('x-')})
+
+
+def runUpdateFrequencyInfo(frequencyUniqueKey, per, metric1, metric2, numberOfCluster, kmeanMaxIteration, kmeanNInit, distanceMeasure, linkageMethod, numberOfClusterForString, kmeanEngine, kmeanTimeBudget, responseFormat, changedColumnsOnly, job: Union[Job, None] = None):
+    '''
+        return the response of the transactions with cluster id, with the kmean info and the dataset version in the headers
+        if job is provided, the view isn't published and None is returned when the job is cancelled
+    '''
     newFrequencyOption = FrequencyOption(
         frequencyUniqueKey, distanceMeasure, linkageMethod, numberOfClusterForString, per=per)
-    # run kmean clustering algorithm
-    transactionDataset.setFrequencyOption(newFrequencyOption)
-    transactionDataset.clusterByKMeans(
-        metric1, metric2, numberOfCluster, maxIteration=kmeanMaxIteration, nInit=kmeanNInit)
+    # run kmean clustering algorithm on a view, the other requests don't change it
+    view = transactionDataset.getView(newFrequencyOption, metric1, metric2, numberOfCluster,
+                                      maxIteration=kmeanMaxIteration, nInit=kmeanNInit, engine=kmeanEngine, timeBudget=kmeanTimeBudget)
+    # the last options become the ones of GET /transactionData and /transactionData/kmean
+    if not publishView(view, job):
+        return None
     # return the dataframe with cluster id
-    return json.loads(transactionDataset.getDataframe().to_json(orient='records'))
+    response = getDataframeResponse(
+        view.getDerivedColumns() if changedColumnsOnly else view.getDataframe(), responseFormat)
+    setKMeanInfoHeaders(response, view.getKMeansInfo())
+    response.headers['X-Dataset-Version'] = str(view.getDataVersion())
+    return response
+
+
+def checkFrequencyParameters(frequencyUniqueKey, distanceMeasure, linkageMethod, numberOfClusterForString):
+    if (frequencyUniqueKey == FrequencyUniqueKey.CLUSTERED_TRANSACTION_DESCRIPTION) and (distanceMeasure == None or linkageMethod == None or numberOfClusterForString == None):
+        raise HTTPException(
+            status_code=404, detail=f"frequencyUnique key is clusteredTransactionDescription, so distanceMeasure, linkagemethod and numberOfClusterForString must be provided")
+    if (frequencyUniqueKey == FrequencyUniqueKey.TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION) and numberOfClusterForString == None:
+        raise HTTPException(
+            status_code=404, detail=f"frequencyUnique key is tfidfClusteredTransactionDescription, so numberOfClusterForString must be provided")
+    if numberOfClusterForString != None and numberOfClusterForString < 1:
+        raise HTTPException(
+            status_code=404, detail=f"invalid numberOfClusterForString, it should be at least 1, but actual: {numberOfClusterForString}")
+
+
+@app.get("/transactionData/updateFrequencyInfo")
+def updateUniqueKey(frequencyUniqueKey: FrequencyUniqueKey,  per: Literal['month', 'day'], metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT, distanceMeasure: Union[DistanceMeasure, None] = None, linkageMethod: Union[LinkageMethod, None] = None, numberOfClusterForString: Union[int, None] = None, kmeanEngine: KMeansEngine = KMeansEngine.EXACT, kmeanTimeBudget: Union[float, None] = None, responseFormat: ResponseFormat = ResponseFormat.RECORDS, changedColumnsOnly: bool = False):
+    '''
+        maxIteration should >VALID_KMEAN_ITERATION[0] and <VALID_KMEAN_ITERATION[1]
+        kmeanEngine=approximate returns within about kmeanTimeBudget seconds, the inertia is in the X-KMean-* headers
+        responseFormat: records (a list of rows), columns (a list of values per column) or arrow (an arrow IPC stream)
+        changedColumnsOnly: only return transactionNumber, frequencyUniqueKey, frequency and cluster, use it with responseFormat=columns to get arrays aligned to transactionNumber.
+            the columns can be merged into the transactions of GET /transactionData if both have the same X-Dataset-Version header
+    '''
+    # update the frequencyUniqueKey, and return the transaction data
+    checkFrequencyParameters(
+        frequencyUniqueKey, distanceMeasure, linkageMethod, numberOfClusterForString)
+    # check metrics and clusterByKmeans
+    checkKMeanParameters(metric1, metric2, kmeanMaxIteration,
+                         kmeanNInit, kmeanTimeBudget)
+    return runUpdateFrequencyInfo(frequencyUniqueKey, per, metric1, metric2, numberOfCluster, kmeanMaxIteration,
+                                  kmeanNInit, distanceMeasure, linkageMethod, numberOfClusterForString, kmeanEngine, kmeanTimeBudget, responseFormat, changedColumnsOnly)
 
 # get cluster id by transactionNumber
 
 
+def runKMean(metric1, metric2, numberOfCluster, kmeanEngine, kmeanTimeBudget, job: Union[Job, None] = None):
+    '''
+        return (the transactionNumber:clusterId pairs, the kmean info)
+        if job is provided, the view isn't published and (None, None) is returned when the job is cancelled
+    '''
+    # run kmean clustering algorithm with the current frequency option
+    view = transactionDataset.getView(transactionDataset.getFrequencyOption(
+    ), metric1, metric2, numberOfCluster, engine=kmeanEngine, timeBudget=kmeanTimeBudget)
+    if not publishView(view, job):
+        return None, None
+    # return the transactionNumber:clusterId pair
+    return view.getClusterIdOfTransactionNumber(), view.getKMeansInfo()
+
+
 @app.get("/transactionData/kmean")
-def getClusterId(metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT):
+def getClusterId(response: Response, metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT, kmeanEngine: KMeansEngine = KMeansEngine.EXACT, kmeanTimeBudget: Union[float, None] = None):
     '''
         maxIteration should >VALID_KMEAN_ITERATION[0] and <VALID_KMEAN_ITERATION[1]
+        kmeanEngine=approximate returns within about kmeanTimeBudget seconds, the inertia is in the X-KMean-* headers
     '''
-    if kmeanMaxIteration < VALID_KMEAN_ITERATION[0] or kmeanMaxIteration > VALID_KMEAN_ITERATION[1]:
-        raise HTTPException(
-            status_code=404, detail=f"invalid kmeanMaxIteration, it should between {VALID_KMEAN_ITERATION[0]} AND {VALID_KMEAN_ITERATION[1]}, but actual: {kmeanMaxIteration}")
-    if kmeanNInit < VALID_KMEAN_N_INIT[0] or kmeanNInit > VALID_KMEAN_N_INIT[1]:
-        raise HTTPException(
-            status_code=404, detail=f"invalid kmeanNInit, it should between {VALID_KMEAN_N_INIT[0]} AND {VALID_KMEAN_N_INIT[1]}, but actual: {kmeanNInit}")
-    if transactionDataset.isValidColumnName(metric1) == False:
-        # reference for error http handling: https://fastapi.tiangolo.com/tutorial/handling-errors/#:~:text=When%20a%20request%20contains%20invalid,to%20decorate%20the%20exception%20handler.
+    checkKMeanParameters(metric1, metric2, kmeanMaxIteration,
+                         kmeanNInit, kmeanTimeBudget)
+    clusterIdOfTransactionNumber, kmeansInfo = runKMean(
+        metric1, metric2, numberOfCluster, kmeanEngine, kmeanTimeBudget)
+    setKMeanInfoHeaders(response, kmeansInfo)
+    return clusterIdOfTransactionNumber
+
+# run updateFrequencyInfo and kmean as jobs, the POST returns the job id at once,
+# the client gets the status with GET /jobs/{jobId} (wait=seconds to wait for the job to finish), and the result with GET /jobs/{jobId}/result
+
+
+def submitJob(kind: str, function):
+    try:
+        return jobQueue.submit(kind, function).getStatus()
+    except JobQueueFullError as error:
+        raise HTTPException(status_code=429, detail=str(error))
+
+
+@app.post("/jobs/updateFrequencyInfo")
+def submitUpdateFrequencyInfoJob(frequencyUniqueKey: FrequencyUniqueKey,  per: Literal['month', 'day'], metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT, distanceMeasure: Union[DistanceMeasure, None] = None, linkageMethod: Union[LinkageMethod, None] = None, numberOfClusterForString: Union[int, None] = None, kmeanEngine: KMeansEngine = KMeansEngine.EXACT, kmeanTimeBudget: Union[float, None] = None, responseFormat: ResponseFormat = ResponseFormat.RECORDS, changedColumnsOnly: bool = False):
+    '''
+        same parameters as GET /transactionData/updateFrequencyInfo
+    '''
+    checkFrequencyParameters(
+        frequencyUniqueKey, distanceMeasure, linkageMethod, numberOfClusterForString)
+    checkKMeanParameters(metric1, metric2, kmeanMaxIteration,
+                         kmeanNInit, kmeanTimeBudget)
+    def runJob(job: Job):
+        response = runUpdateFrequencyInfo(frequencyUniqueKey, per, metric1, metric2, numberOfCluster, kmeanMaxIteration, kmeanNInit, distanceMeasure,
+                                          linkageMethod, numberOfClusterForString, kmeanEngine, kmeanTimeBudget, responseFormat, changedColumnsOnly, job)
+        return toJobResult(response) if response != None else None
+    return submitJob('updateFrequencyInfo', runJob)
+
+
+@app.post("/jobs/kmean")
+def submitKMeanJob(metric1: str, metric2: str, numberOfCluster: int, kmeanMaxIteration: int = DEFAULT_KMEAN_MAX_ITERATION, kmeanNInit: int = DEFAULT_KMEAN_N_INIT, kmeanEngine: KMeansEngine = KMeansEngine.EXACT, kmeanTimeBudget: Union[float, None] = None):
+    '''
+        same parameters as GET /transactionData/kmean
+    '''
+    checkKMeanParameters(metric1, metric2, kmeanMaxIteration,
+                         kmeanNInit, kmeanTimeBudget)
+    def runJob(job: Job):
+        clusterIdOfTransactionNumber, kmeansInfo = runKMean(
+            metric1, metric2, numberOfCluster, kmeanEngine, kmeanTimeBudget, job)
+        if clusterIdOfTransactionNumber == None:
+            return None
+        # serialised like the response of GET /transactionData/kmean
+        response = JSONResponse(jsonable_encoder(clusterIdOfTransactionNumber))
+        setKMeanInfoHeaders(response, kmeansInfo)
+        return toJobResult(response)
+    return submitJob('kmean', runJob)
+
+
+@app.get("/jobs")
+def getJobQueueInfo():
+    return jobQueue.getInfo()
+
+
+def getExistingJob(jobId: str, wait: float = 0):
+    job = jobQueue.wait(jobId, wait) if wait > 0 else jobQueue.getJob(jobId)
+    if job == None:
         raise HTTPException(
-            status_code=404, detail=f"{metric1} is invalid, only support {str(transactionDataset.getColumnNames())}")
-    elif transactionDataset.isValidColumnName(metric2) == False:
+            status_code=404, detail=f"job {jobId} doesn't exist or is too old")
+    return job
+
+
+@app.get("/jobs/{jobId}")
+def getJobStatus(jobId: str, wait: float = 0):
+    '''
+        wait: wait at most this number of seconds for the job to finish before returning the status
+    '''
+    return getExistingJob(jobId, min(max(wait, 0), MAX_JOB_WAIT)).getStatus()
+
+
+@app.get("/jobs/{jobId}/result")
+def getJobResult(jobId: str):
+    job = getExistingJob(jobId)
+    if job.status != 'done':
+        raise HTTPException(status_code=409, detail=job.getStatus())
+    result = job.result
+    if result == None:
         raise HTTPException(
-            status_code=404, detail=f"{metric2} is invalid, only support {str(transactionDataset.getColumnNames())}")
-    else:
-        # run kmean clustering algorithm
-        transactionDataset.clusterByKMeans(metric1, metric2, numberOfCluster)
-        # return the transactionNumber:clusterId pair
-        return transactionDataset.getClusterIdOfTransactionNumber()
+            status_code=410, detail=f"the result of job {jobId} has been dropped to keep the newer results")
+    return Response(content=result.content, media_type=result.mediaType, headers=result.headers)
+
+
+@app.delete("/jobs/{jobId}")
+def cancelJob(jobId: str):
+    '''
+        a queued job is cancelled at once, a running job keeps running but its result is dropped
+    '''
+    getExistingJob(jobId)
+    return jobQueue.cancel(jobId).getStatus()
@@ -0,0 +1,179 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+import types
+from typing import Callable, Union
+
+import numpy as np
+
+from app.fileLock import fileLock, removeUnusedLockFile
+
+# change it when the way a cached matrix is computed changes, so the old files are not used anymore
+MATRIX_CACHE_VERSION = 2
+# the default limits of the folder, the matrices used the least recently are removed above them
+DEFAULT_MAX_SIZE = 4 * 1024 ** 3
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+# the temporary file of a save that has been interrupted is removed after this time
+TEMPORARY_FILE_MAX_AGE = 3600
+CACHED_MATRIX_FILE_NAME = re.compile(r'[0-9a-f]{64}\.npy')
+
+
+class MatrixCache:
+    '''
+    A folder of numpy matrices saved as .npy files, each file is named by a key that is a hash of everything the matrix is computed from.
+    A matrix is loaded back memory-mapped and read only, so different processes can share the same file.
+
+    Attributes:
+        directory (str): the folder of the .npy files, it will be created if it doesn't exist
+        maxSize (int or None): the maximum number of bytes of the .npy files, None for no limit
+        maxAge (float or None): the maximum number of seconds since a .npy file was last loaded or saved, None for no limit
+
+    Behaviors:
+        getKey (*parts): return a key from the parts the matrix is computed from
+        load (key, expectedShape): return the matrix of the key or None
+        save (key, matrix): save the matrix with the key
+        lock (key): a context manager holding a lock of the key across processes, so only one process computes the matrix of a key
+        evict: remove the files above maxSize or older than maxAge and the unused lock files, it is run when the cache is created and after a matrix is saved
+    '''
+
+    def __init__(self, directory: str, maxSize: Union[int, None] = DEFAULT_MAX_SIZE, maxAge: Union[float, None] = DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        os.makedirs(self.directory, exist_ok=True)
+        self.evict()
+
+    @staticmethod
+    def getKey(*parts) -> str:
+        '''
+        return a sha256 hex digest of the parts, a part can be a str, a list of str or a function
+        a function is hashed by its name and its compiled code, so editing the function invalidates the key
+        '''
+        hasher = hashlib.sha256(str(MATRIX_CACHE_VERSION).encode('utf-8'))
+        for part in parts:
+            if isinstance(part, (list, tuple)):
+                hasher.update(str(len(part)).encode('utf-8'))
+                for string in part:
+                    # separate the strings so ['ab', 'c'] and ['a', 'bc'] have different keys
+                    hasher.update(string.encode('utf-8') + b'\x00')
+            elif callable(part):
+                hasher.update(MatrixCache._getFunctionIdentity(part))
+            else:
+                hasher.update(str(part).encode('utf-8'))
+            hasher.update(b'\x01')
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _getFunctionIdentity(function: Callable) -> bytes:
+        identity = f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}".encode(
+            'utf-8')
+        code = getattr(function, '__code__', None)
+        if code != None:
+            identity += MatrixCache._getCodeIdentity(code)
+        return identity
+
+    @staticmethod
+    def _getCodeIdentity(code: types.CodeType) -> bytes:
+        '''
+        the repr of a nested code object (like a list comprehension) has its memory address, and the repr of a frozenset depends on the hash seed,
+        so they are hashed by their content, otherwise the key would be different in every process
+        '''
+        identity = code.co_code + repr(code.co_names).encode('utf-8')
+        for constant in code.co_consts:
+            if isinstance(constant, types.CodeType):
+                identity += MatrixCache._getCodeIdentity(constant)
+            elif isinstance(constant, frozenset):
+                identity += repr(sorted(repr(item)
+                                 for item in constant)).encode('utf-8')
+            else:
+                identity += repr(constant).encode('utf-8')
+        return identity
+
+    def getPath(self, key: str) -> str:
+        return os.path.join(self.directory, key + '.npy')
+
+    def load(self, key: str, expectedShape: tuple) -> Union[np.ndarray, None]:
+        '''
+        return the memory-mapped read only matrix of the key, or None if there is no such file.
+        a file that can't be read or doesn't have the expectedShape is removed and None is returned
+        '''
+        path = self.getPath(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            matrix = np.load(path, mmap_mode='r')
+            if matrix.shape != expectedShape:
+                raise ValueError(
+                    f'expect shape {expectedShape}, actual: {matrix.shape}')
+            # the modification time is the last time the matrix is used, see evict
+            os.utime(path)
+            return matrix
+        except Exception as error:
+            print(f'remove invalid cached matrix {path}: {error}')
+            self.remove(key)
+            return None
+
+    def save(self, key: str, matrix: np.ndarray):
+        '''
+        save the matrix with the key, the file is written to a temporary file first and then renamed,
+        so another process never reads a half written file
+        '''
+        fileDescriptor, temporaryPath = tempfile.mkstemp(
+            suffix='.npy', dir=self.directory)
+        try:
+            with os.fdopen(fileDescriptor, 'wb') as file:
+                np.save(file, matrix)
+            os.replace(temporaryPath, self.getPath(key))
+        except Exception:
+            if os.path.exists(temporaryPath):
+                os.remove(temporaryPath)
+            raise
+        self.evict(keepKey=key)
+
+    def lock(self, key: str):
+        return fileLock(os.path.join(self.directory, key + '.lock'))
+
+    def evict(self, keepKey: Union[str, None] = None):
+        '''
+        remove the .npy files not used for maxAge seconds, then the least recently used ones until they take at most maxSize bytes,
+        the file of keepKey is kept. a process that has memory-mapped a removed file can still read it, the next load of its key is a miss.
+        the lock files no process holds are removed, and the temporary files of the interrupted saves
+        '''
+        now = time.time()
+        fileList = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if CACHED_MATRIX_FILE_NAME.fullmatch(entry.name):
+                fileList.append((stat.st_mtime, stat.st_size, entry.name))
+            elif entry.name.endswith('.lock'):
+                removeUnusedLockFile(entry.path)
+            elif entry.name.endswith('.npy') and now - stat.st_mtime > TEMPORARY_FILE_MAX_AGE:
+                self.__removeFile(entry.name)
+        totalSize = sum(size for _, size, _ in fileList)
+        # the least recently used first
+        for modificationTime, size, name in sorted(fileList):
+            isTooOld = self.maxAge != None and now - modificationTime > self.maxAge
+            isTooBig = self.maxSize != None and totalSize > self.maxSize
+            if not isTooOld and not isTooBig:
+                break
+            if keepKey != None and name == keepKey + '.npy':
+                continue
+            self.__removeFile(name)
+            totalSize -= size
+
+    def __removeFile(self, name: str):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+
+    def remove(self, key: str):
+        try:
+            os.remove(self.getPath(key))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+# change it when the way a dataframe is published changes, so the old folders are not used anymore
+SHARED_DATAFRAME_VERSION = 1
+SCHEMA_FILE_NAME = 'schema.json'
+
+
+def publishDataframe(dataframe: pd.DataFrame, path: str):
+    '''
+        save every column of the dataframe as .npy files in the folder path, so that attachDataframe can memory-map them.
+        the folder is written under a temporary name first and then renamed, so another process never reads a half written folder
+        supported columns: numbers, booleans, datetime64[ns], categorical of strings and nullable integers (like UInt32)
+    '''
+    parentDirectory = os.path.dirname(path) or '.'
+    os.makedirs(parentDirectory, exist_ok=True)
+    temporaryPath = tempfile.mkdtemp(dir=parentDirectory)
+    try:
+        schema = {'version': SHARED_DATAFRAME_VERSION, 'numberOfRow': len(dataframe), 'columns': []}
+        for columnIndex, columnName in enumerate(dataframe.columns):
+            column = dataframe[columnName]
+            fileName = f'{columnIndex}'
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                kind = 'category'
+                np.save(os.path.join(temporaryPath, fileName + '.npy'), column.cat.codes.to_numpy())
+                extra = {'categories': column.cat.categories.tolist(), 'ordered': bool(column.cat.ordered)}
+            elif isinstance(column.dtype, pd.api.extensions.ExtensionDtype) and hasattr(column.array, '_mask'):
+                kind = 'masked'
+                # reference: https://pandas.pydata.org/docs/reference/api/pandas.arrays.IntegerArray.html
+                np.save(os.path.join(temporaryPath, fileName + '.npy'), column.array._data)
+                np.save(os.path.join(temporaryPath, fileName + '.mask.npy'), column.array._mask)
+                extra = {'dtype': str(column.dtype)}
+            elif column.dtype == np.dtype('datetime64[ns]'):
+                kind = 'datetime'
+                np.save(os.path.join(temporaryPath, fileName + '.npy'), column.to_numpy().view(np.int64))
+                extra = {}
+            elif column.dtype.kind in 'biuf':
+                kind = 'numpy'
+                np.save(os.path.join(temporaryPath, fileName + '.npy'), column.to_numpy())
+                extra = {}
+            else:
+                raise ValueError(f'column {columnName} of type {column.dtype} can not be shared')
+            schema['columns'].append({'name': columnName, 'kind': kind, 'fileName': fileName, **extra})
+        with open(os.path.join(temporaryPath, SCHEMA_FILE_NAME), 'w') as file:
+            json.dump(schema, file)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(temporaryPath, path)
+    except Exception:
+        shutil.rmtree(temporaryPath, ignore_errors=True)
+        raise
+
+
+def isPublished(path: str) -> bool:
+    '''
+        return True if the folder has a dataframe published with the current SHARED_DATAFRAME_VERSION
+    '''
+    try:
+        with open(os.path.join(path, SCHEMA_FILE_NAME)) as file:
+            return json.load(file)['version'] == SHARED_DATAFRAME_VERSION
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def attachDataframe(path: str) -> pd.DataFrame:
+    '''
+        return the dataframe published in the folder path, its columns are read only memory-mapped files,
+        so the processes attaching the same folder share the memory (except the categories and the column names).
+        a column can be replaced but not changed in place
+    '''
+    with open(os.path.join(path, SCHEMA_FILE_NAME)) as file:
+        schema = json.load(file)
+    columns = {}
+    for columnSchema in schema['columns']:
+        values = np.load(os.path.join(path, columnSchema['fileName'] + '.npy'), mmap_mode='r')
+        kind = columnSchema['kind']
+        if kind == 'category':
+            values = pd.Categorical.from_codes(values, categories=columnSchema['categories'], ordered=columnSchema['ordered'])
+        elif kind == 'masked':
+            mask = np.load(os.path.join(path, columnSchema['fileName'] + '.mask.npy'), mmap_mode='r')
+            arrayType = pd.api.types.pandas_dtype(
+                columnSchema['dtype']).construct_array_type()
+            values = arrayType(values, mask, copy=False)
+        elif kind == 'datetime':
+            values = values.view('datetime64[ns]')
+        columns[columnSchema['name']] = pd.Series(values, copy=False)
+    # a dict of series doesn't consolidate the columns into new blocks, so the columns stay memory-mapped
+    return pd.DataFrame(columns, copy=False)
+
+
+def selectColumns(dataframe: pd.DataFrame, columnNames: list[str], positions: Union[np.ndarray, None] = None) -> pd.DataFrame:
+    '''
+        return the columnNames columns of the rows at positions (all the rows if None), like dataframe.iloc[positions][columnNames].
+        selecting several rows or columns makes pandas merge the columns of the same type of the dataframe into new arrays,
+        which copies the memory-mapped columns, this selects the columns one by one so the dataframe is not changed
+    '''
+    if positions is None:
+        return pd.DataFrame({columnName: dataframe[columnName] for columnName in columnNames}, copy=False)
+    return pd.DataFrame({columnName: dataframe[columnName].iloc[positions] for columnName in columnNames}, copy=False)
@@ -0,0 +1,138 @@
+import bisect
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# the upper bounds (seconds) of the histogram buckets, from a cached lookup to building a distance matrix
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60, 300, math.inf)
+PROMETHEUS_TEXT_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class StageMetrics:
+    '''
+    The duration histograms of the stages of the pipeline (loading the transactions, the frequency, the string clustering, kmeans...)
+    and gauges like the cache sizes and counters like the cache hits, written in the Prometheus text format.
+    Recording a duration is a dictionary lookup and a few additions under a lock, the text is only built when it is scraped,
+    and the gauges and counters are only read then.
+
+    Attributes:
+        name (str): the prefix of the metric names
+        buckets (tuple): the upper bounds of the buckets, the last one is math.inf
+
+    Behaviors:
+        observe (stage, seconds, **labels): add a duration of the stage
+        time (stage, **labels): a context manager adding the duration of its block
+        timed (stage): a decorator adding the duration of each call of the function
+        registerGauge (name, help, function): function() returns a list of (labels, value), it is called when the text is built
+        registerCounter (name, help, function): like registerGauge for values that only increase, the metric is named name_total
+        getPrometheusText: return the histograms, the gauges and the counters in the Prometheus text format
+    '''
+
+    def __init__(self, name: str = 'pipeline', buckets: tuple = DEFAULT_BUCKETS):
+        if buckets[-1] != math.inf:
+            buckets = tuple(buckets) + (math.inf,)
+        self.name = name
+        self.buckets = buckets
+        # (stage, labels) -> [count of each bucket (not cumulative), sum]
+        self.histograms: dict[tuple, list] = {}
+        # metric name -> (type, help, function), the gauges and the counters
+        self.gauges: dict[str, tuple[str, str, Callable[[], list[tuple[dict, float]]]]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        bucketIndex = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram == None:
+                histogram = self.histograms[key] = [[0] * len(self.buckets), 0.0]
+            histogram[0][bucketIndex] += 1
+            histogram[1] += seconds
+
+    @contextmanager
+    def time(self, stage: str, **labels):
+        '''
+            the duration is added even if the block raises an error
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def timed(self, stage: str):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def registerGauge(self, name: str, help: str, function: Callable[[], list[tuple[dict, float]]]):
+        '''
+            register (or replace) the gauge name, function() returns a list of (labels, value) and is called by getPrometheusText
+        '''
+        with self.lock:
+            self.gauges[name] = ('gauge', help, function)
+
+    def registerCounter(self, name: str, help: str, function: Callable[[], list[tuple[dict, float]]]):
+        '''
+            register (or replace) the counter name_total, function() returns a list of (labels, value) of values that only increase
+        '''
+        with self.lock:
+            self.gauges[name + '_total'] = ('counter', help, function)
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def getPrometheusText(self) -> str:
+        '''
+            reference: https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+        '''
+        with self.lock:
+            histograms = {key: (list(counts), total)
+                          for key, (counts, total) in self.histograms.items()}
+            gauges = dict(self.gauges)
+        metricName = f'{self.name}_stage_duration_seconds'
+        lines = [f'# HELP {metricName} the duration of each stage of the pipeline, the count is the number of call',
+                 f'# TYPE {metricName} histogram']
+        for (stage, labels), (counts, total) in sorted(histograms.items()):
+            labelText = getLabelText((('stage', stage),) + labels)
+            cumulativeCount = 0
+            for bucket, count in zip(self.buckets, counts):
+                cumulativeCount += count
+                upperBound = '+Inf' if bucket == math.inf else repr(float(bucket))
+                lines.append(
+                    f'{metricName}_bucket{{{labelText},le="{upperBound}"}} {cumulativeCount}')
+            lines.append(f'{metricName}_sum{{{labelText}}} {total}')
+            lines.append(f'{metricName}_count{{{labelText}}} {cumulativeCount}')
+        for name, (metricType, help, function) in sorted(gauges.items()):
+            gaugeName = f'{self.name}_{name}'
+            metricLines = [f'# HELP {gaugeName} {help}', f'# TYPE {gaugeName} {metricType}']
+            try:
+                for labels, value in function():
+                    labelText = getLabelText(tuple(sorted(labels.items())))
+                    metricLines.append(f'{gaugeName}{{{labelText}}} {float(value)}' if labelText != ''
+                                       else f'{gaugeName} {float(value)}')
+            except Exception as error:
+                # skip the metric, so one failing function doesn't fail the whole scrape
+                print(f'skip the metric {gaugeName}: {type(error).__name__}: {error}')
+                continue
+            lines += metricLines
+        return '\n'.join(lines) + '\n'
+
+
+def getLabelText(labels: tuple) -> str:
+    # the label values are escaped like the format requires
+    return ','.join(f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+                    for name, value in labels)
+
+
+# the metrics of the pipeline, shared by the modules of the app and exposed by GET /metrics
+stageMetrics = StageMetrics()
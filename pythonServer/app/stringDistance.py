@@ -0,0 +1,344 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import jellyfish
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein, DamerauLevenshtein, Hamming, Jaro, JaroWinkler
+# reference for rapidfuzz: https://rapidfuzz.github.io/RapidFuzz/Usage/process.html#cdist
+
+# number of pairs computed in one go, bounds the size of the temporary block matrix
+BLOCK_PAIR_SIZE = 2_000_000
+# the rapidfuzz metrics are computed by the threads of rapidfuzz (cdist workers), there is no process to start.
+# the other metrics are computed with numpy in a pool of processes, which takes about a second to start,
+# so the pool is only used when the serial computation is estimated to take more than MIN_PARALLEL_SECONDS
+MIN_PARALLEL_SECONDS = 5
+# the serial seconds per pair of the metrics computed with numpy, measured on 1.28M pairs of strings of 5 to 25 characters
+SECONDS_PER_PAIR = {'MatchRatingApproach': 3e-7}
+# number of blocks per worker in parallel mode, smaller blocks balance the work between workers
+BLOCK_PER_WORKER = 8
+
+# scorers computed by rapidfuzz in c++, their values are the same as the jellyfish functions used before
+RAPIDFUZZ_SCORER = {
+    'levenshtein': Levenshtein.distance,
+    'damerauLevenshtein': DamerauLevenshtein.distance,
+    'hamming': Hamming.distance,
+    'jaroSimilarity': Jaro.similarity,
+    'jaroWinklerSimilarity': JaroWinkler.similarity,
+}
+
+# for these metrics a greater value means more similar strings
+SIMILARITY_METRIC = ['jaroSimilarity',
+                     'jaroWinklerSimilarity', 'MatchRatingApproach']
+
+MATCH_RATING_APPROACH_MATCH = 0.9
+MATCH_RATING_APPROACH_NOT_MATCH = 0.1
+MATCH_RATING_CODEX_MAX_LENGTH = 6
+
+# the metrics whose distances are integers no greater than the length of the longest string
+INTEGER_DISTANCE_METRIC = ['levenshtein', 'damerauLevenshtein', 'hamming']
+# the compact distances of these metrics are distance * scale, 0.9 and 0.1 are stored as 9 and 1, 9 / 10 == 0.9 in float64
+COMPACT_DISTANCE_SCALE = {'MatchRatingApproach': 10}
+# the metrics with a smaller type than float64 in a compact matrix, the jaro similarities are kept as float64,
+# because rounding them to float32 changes the merge heights and the ties of linkage, so the clusters could change
+COMPACT_DISTANCE_METRIC = INTEGER_DISTANCE_METRIC + list(COMPACT_DISTANCE_SCALE)
+
+
+def getCondensedDistanceMatrix(stringList, distanceMetric: str, numberOfWorker: int = 1, compact: bool = False) -> np.ndarray:
+    '''
+        return the condensed distance matrix (same layout as scipy.spatial.distance.pdist) of stringList,
+        the whole matrix is computed in batches, there is no python call for each pair of string.
+        distanceMetric: one of 'levenshtein' or 'damerauLevenshtein' or 'hamming' or 'jaroSimilarity' or 'jaroWinklerSimilarity' or 'MatchRatingApproach'
+        numberOfWorker: if greater than 1, the rapidfuzz metrics are computed by numberOfWorker threads, the other metrics by a pool of numberOfWorker processes
+            if it is worth starting them (see isWorthParallel), the result is the same as numberOfWorker=1
+        compact: if True, the matrix has the smaller type of getCompactDistanceType, each block is converted when it is written,
+            use widenDistanceMatrix to get the float64 distances
+    '''
+    stringData = prepareStringData(stringList, distanceMetric)
+    numberOfString = len(stringData[0])
+    numberOfPair = numberOfString * (numberOfString - 1) // 2
+    dtype = getCompactDistanceType(
+        stringData[0], distanceMetric) if compact else np.dtype(np.float64)
+    if numberOfWorker > 1 and isWorthParallel(distanceMetric, numberOfPair):
+        return _getCondensedDistanceMatrixInParallel(stringData, distanceMetric, numberOfWorker, dtype)
+    distanceMatrix = np.empty(numberOfPair, dtype=dtype)
+    for rowStart, rowEnd in getRowBlockList(numberOfString):
+        _writeRowBlock(distanceMatrix, stringData,
+                       distanceMetric, rowStart, rowEnd, numberOfWorker)
+    return distanceMatrix
+
+
+def isWorthParallel(distanceMetric: str, numberOfPair: int) -> bool:
+    '''
+        return True if the pairs of the metric should be computed by a pool of processes, the rapidfuzz metrics never are
+    '''
+    if distanceMetric not in SECONDS_PER_PAIR:
+        return False
+    return numberOfPair * SECONDS_PER_PAIR[distanceMetric] >= MIN_PARALLEL_SECONDS
+
+
+def getCompactDistanceType(stringList: list[str], distanceMetric: str) -> np.dtype:
+    '''
+        return the smallest type holding the distances of stringList exactly, so the clusters don't change:
+        uint8 or uint16 for the integer metrics (depending on the length of the longest string), uint8 for 'MatchRatingApproach' (see COMPACT_DISTANCE_SCALE),
+        float64 for the jaro similarities (see COMPACT_DISTANCE_METRIC)
+    '''
+    if distanceMetric in COMPACT_DISTANCE_SCALE:
+        return np.dtype(np.uint8)
+    if distanceMetric in INTEGER_DISTANCE_METRIC:
+        maxLength = max([len(string) for string in stringList], default=0)
+        for dtype in [np.uint8, np.uint16, np.uint32]:
+            if maxLength <= np.iinfo(dtype).max:
+                return np.dtype(dtype)
+    return np.dtype(np.float64)
+
+
+def widenDistanceMatrix(distanceMatrix: np.ndarray, distanceMetric: str) -> np.ndarray:
+    '''
+        return the float64 distances of a matrix of getCondensedDistanceMatrix (compact or not), for scipy linkage
+    '''
+    if distanceMatrix.dtype == np.float64:
+        return distanceMatrix
+    if distanceMetric in COMPACT_DISTANCE_SCALE:
+        return distanceMatrix / np.float64(COMPACT_DISTANCE_SCALE[distanceMetric])
+    return distanceMatrix.astype(np.float64)
+
+
+def _writeRowBlock(distanceMatrix: np.ndarray, stringData: tuple, distanceMetric: str, rowStart: int, rowEnd: int, numberOfThread: int = 1):
+    numberOfString = len(stringData[0])
+    start = getCondensedIndex(numberOfString, rowStart)
+    end = getCondensedIndex(numberOfString, rowEnd)
+    blockDistance = getDistanceOfRowBlock(
+        stringData, distanceMetric, rowStart, rowEnd, numberOfThread)
+    if distanceMatrix.dtype != np.float64 and distanceMetric in COMPACT_DISTANCE_SCALE:
+        blockDistance = np.rint(
+            blockDistance * COMPACT_DISTANCE_SCALE[distanceMetric])
+    distanceMatrix[start:end] = blockDistance
+
+
+def _getCondensedDistanceMatrixInParallel(stringData: tuple, distanceMetric: str, numberOfWorker: int, dtype: np.dtype) -> np.ndarray:
+    '''
+        split the condensed matrix into row blocks, the worker processes write their blocks straight into one shared memory buffer
+    '''
+    numberOfString = len(stringData[0])
+    numberOfPair = numberOfString * (numberOfString - 1) // 2
+    blockPairSize = max(1, min(BLOCK_PAIR_SIZE, numberOfPair //
+                        (numberOfWorker * BLOCK_PER_WORKER)))
+    sharedMemory = SharedMemory(
+        create=True, size=max(1, numberOfPair * dtype.itemsize))
+    try:
+        # spawn instead of fork, the server may have other threads running
+        with ProcessPoolExecutor(max_workers=numberOfWorker, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_initialiseWorker, initargs=(sharedMemory.name, numberOfPair, stringData, distanceMetric, dtype.str)) as executor:
+            futureList = [executor.submit(_computeRowBlockInWorker, rowStart, rowEnd)
+                          for rowStart, rowEnd in getRowBlockList(numberOfString, blockPairSize)]
+            for future in futureList:
+                # raise the error of the worker if there is one
+                future.result()
+        sharedDistanceMatrix = np.ndarray(
+            (numberOfPair,), dtype=dtype, buffer=sharedMemory.buf)
+        distanceMatrix = sharedDistanceMatrix.copy()
+        del sharedDistanceMatrix
+        return distanceMatrix
+    finally:
+        sharedMemory.close()
+        sharedMemory.unlink()
+
+
+# the state of a worker process, set by _initialiseWorker
+_workerState = {}
+
+
+def _initialiseWorker(sharedMemoryName: str, numberOfPair: int, stringData: tuple, distanceMetric: str, dtype: str):
+    sharedMemory = SharedMemory(name=sharedMemoryName)
+    _workerState['sharedMemory'] = sharedMemory
+    _workerState['distanceMatrix'] = np.ndarray(
+        (numberOfPair,), dtype=np.dtype(dtype), buffer=sharedMemory.buf)
+    _workerState['stringData'] = stringData
+    _workerState['distanceMetric'] = distanceMetric
+
+
+def _computeRowBlockInWorker(rowStart: int, rowEnd: int):
+    _writeRowBlock(_workerState['distanceMatrix'], _workerState['stringData'],
+                   _workerState['distanceMetric'], rowStart, rowEnd)
+
+
+def prepareStringData(stringList, distanceMetric: str) -> tuple:
+    '''
+        return the per string data needed by getDistanceOfRowBlock, computed once for all the blocks:
+        (stringList, isEmptyArray) for rapidfuzz metrics, (stringList, codexArray, codexLength) for 'MatchRatingApproach'
+    '''
+    stringList = list(stringList)
+    if distanceMetric == 'MatchRatingApproach':
+        return (stringList, *getMatchRatingCodexArray(stringList))
+    if distanceMetric not in RAPIDFUZZ_SCORER:
+        raise ValueError('invalid distance metric')
+    isEmptyArray = np.array([len(string) == 0 for string in stringList], dtype=bool)
+    return (stringList, isEmptyArray)
+
+
+def getRowBlockList(numberOfString: int, blockPairSize: int = BLOCK_PAIR_SIZE) -> list[tuple[int, int]]:
+    '''
+        split the rows of the upper triangle into blocks of [rowStart, rowEnd), each block has about blockPairSize pairs
+    '''
+    rowBlockList = []
+    rowStart = 0
+    while rowStart < numberOfString - 1:
+        rowEnd = rowStart + max(1, blockPairSize //
+                                max(1, numberOfString - rowStart))
+        rowEnd = min(rowEnd, numberOfString - 1)
+        rowBlockList.append((rowStart, rowEnd))
+        rowStart = rowEnd
+    return rowBlockList
+
+
+def getCondensedIndex(numberOfString: int, row: int) -> int:
+    '''
+        return the index in the condensed matrix of the pair (row, row+1)
+    '''
+    return row * numberOfString - row * (row + 1) // 2
+
+
+def getDistanceOfRowBlock(stringData: tuple, distanceMetric: str, rowStart: int, rowEnd: int, numberOfThread: int = 1) -> np.ndarray:
+    '''
+        return the condensed distances of the pairs (i, j) where rowStart <= i < rowEnd and i < j, in the order of pdist
+        stringData: returned by prepareStringData
+        numberOfThread: the number of threads rapidfuzz uses, the 'MatchRatingApproach' distances are computed in the calling thread
+    '''
+    if distanceMetric == 'MatchRatingApproach':
+        _, codexArray, codexLength = stringData
+        return _getMatchRatingApproachDistanceOfRowBlock(codexArray, codexLength, rowStart, rowEnd)
+    stringList, isEmptyArray = stringData
+    blockMatrix = process.cdist(stringList[rowStart:rowEnd], stringList[rowStart:],
+                                scorer=RAPIDFUZZ_SCORER[distanceMetric], dtype=np.float64, workers=numberOfThread)
+    upperTriangleMask = np.triu(np.ones(blockMatrix.shape, dtype=bool), k=1)
+    blockDistance = blockMatrix[upperTriangleMask]
+    if distanceMetric in ('jaroSimilarity', 'jaroWinklerSimilarity'):
+        # jellyfish gives 0 for two empty strings, rapidfuzz gives 1
+        bothEmpty = (isEmptyArray[rowStart:rowEnd, np.newaxis] &
+                     isEmptyArray[np.newaxis, rowStart:])[upperTriangleMask]
+        blockDistance[bothEmpty] = 0.0
+    return blockDistance
+
+
+def getDistanceOfPairs(stringData: tuple, distanceMetric: str, rowIndex: np.ndarray, columnIndex: np.ndarray) -> np.ndarray:
+    '''
+        return the distances of the pairs (rowIndex[k], columnIndex[k]), with the same values as the condensed distance matrix
+        stringData: returned by prepareStringData
+    '''
+    if distanceMetric == 'MatchRatingApproach':
+        _, codexArray, codexLength = stringData
+        isMatch = compareMatchRatingCodex(codexArray[rowIndex], codexLength[rowIndex],
+                                          codexArray[columnIndex], codexLength[columnIndex])
+        return np.where(isMatch, MATCH_RATING_APPROACH_MATCH, MATCH_RATING_APPROACH_NOT_MATCH)
+    stringList, isEmptyArray = stringData
+    stringArray = np.array(stringList, dtype=object)
+    distance = process.cpdist(stringArray[rowIndex], stringArray[columnIndex],
+                              scorer=RAPIDFUZZ_SCORER[distanceMetric], dtype=np.float64)
+    if distanceMetric in ('jaroSimilarity', 'jaroWinklerSimilarity'):
+        # jellyfish gives 0 for two empty strings, rapidfuzz gives 1
+        distance[isEmptyArray[rowIndex] & isEmptyArray[columnIndex]] = 0.0
+    return distance
+
+
+def getDistanceOfRows(queryStringList: list[str], stringList: list[str], distanceMetric: str) -> np.ndarray:
+    '''
+        return a (len(queryStringList), len(stringList)) matrix of the distance between every query string and every string,
+        with the same values as the condensed distance matrix
+    '''
+    queryStringData = prepareStringData(queryStringList, distanceMetric)
+    stringData = prepareStringData(stringList, distanceMetric)
+    numberOfQuery, numberOfString = len(queryStringData[0]), len(stringData[0])
+    if distanceMetric == 'MatchRatingApproach':
+        _, queryCodexArray, queryCodexLength = queryStringData
+        _, codexArray, codexLength = stringData
+        # the codex arrays can have different width if a codex is longer than 6
+        width = max(queryCodexArray.shape[1], codexArray.shape[1])
+        queryCodexArray = np.pad(queryCodexArray, ((0, 0), (0, width - queryCodexArray.shape[1])))
+        codexArray = np.pad(codexArray, ((0, 0), (0, width - codexArray.shape[1])))
+        queryIndex = np.repeat(np.arange(numberOfQuery), numberOfString)
+        stringIndex = np.tile(np.arange(numberOfString), numberOfQuery)
+        isMatch = compareMatchRatingCodex(queryCodexArray[queryIndex], queryCodexLength[queryIndex],
+                                          codexArray[stringIndex], codexLength[stringIndex])
+        return np.where(isMatch, MATCH_RATING_APPROACH_MATCH, MATCH_RATING_APPROACH_NOT_MATCH).reshape(numberOfQuery, numberOfString)
+    distanceMatrix = process.cdist(queryStringData[0], stringData[0],
+                                   scorer=RAPIDFUZZ_SCORER[distanceMetric], dtype=np.float64)
+    if distanceMetric in ('jaroSimilarity', 'jaroWinklerSimilarity'):
+        # jellyfish gives 0 for two empty strings, rapidfuzz gives 1
+        distanceMatrix[queryStringData[1][:, np.newaxis]
+                       & stringData[1][np.newaxis, :]] = 0.0
+    return distanceMatrix
+
+
+def _getMatchRatingApproachDistanceOfRowBlock(codexArray: np.ndarray, codexLength: np.ndarray, rowStart: int, rowEnd: int) -> np.ndarray:
+    '''
+        vectorised version of jellyfish.match_rating_comparison for all the pairs of a row block,
+        the codex is computed once per string, then the pairs are compared with numpy.
+        return 0.9 if the pair match, otherwise 0.1 (no result is treated as not match)
+    '''
+    numberOfString = codexArray.shape[0]
+    rowIndex, columnIndex = np.triu_indices(
+        rowEnd - rowStart, k=1, m=numberOfString - rowStart)
+    rowIndex += rowStart
+    columnIndex += rowStart
+    isMatch = compareMatchRatingCodex(codexArray[rowIndex], codexLength[rowIndex],
+                                      codexArray[columnIndex], codexLength[columnIndex])
+    return np.where(isMatch, MATCH_RATING_APPROACH_MATCH, MATCH_RATING_APPROACH_NOT_MATCH)
+
+
+def getMatchRatingCodexArray(stringList: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        return (codexArray, codexLength), codexArray is a (n, 6) array of unicode code point of the codex of each string, padded by 0
+        codexLength is the length of the codex in utf-8 bytes, which is the length jellyfish uses for the comparison
+    '''
+    codexList = [jellyfish.match_rating_codex(string) for string in stringList]
+    width = max([MATCH_RATING_CODEX_MAX_LENGTH] + [len(codex) for codex in codexList])
+    codexArray = np.zeros((len(stringList), width), dtype=np.int32)
+    codexLength = np.zeros(len(stringList), dtype=np.int32)
+    for index, codex in enumerate(codexList):
+        codexArray[index, :len(codex)] = [ord(c) for c in codex]
+        codexLength[index] = len(codex.encode('utf-8'))
+    return codexArray, codexLength
+
+
+def compareMatchRatingCodex(codex1: np.ndarray, length1: np.ndarray, codex2: np.ndarray, length2: np.ndarray) -> np.ndarray:
+    '''
+        compare the codex pairs row by row, follow the same steps as jellyfish.match_rating_comparison
+        return a boolean array, True if the pair match
+    '''
+    # get minimum rating based on sums of codexes
+    lengthSum = length1 + length2
+    minRating = np.select([lengthSum <= 4, lengthSum <= 7, lengthSum <= 11],
+                          [5, 4, 3], default=2)
+
+    # strip off common prefixes, keep the unmatched character in order
+    isDifferent = codex1 != codex2
+    isKept1 = isDifferent & (codex1 != 0)
+    isKept2 = isDifferent & (codex2 != 0)
+
+    # compare the unmatched characters from the end
+    reversed1 = _getReversedKeptCharacter(codex1, isKept1)
+    reversed2 = _getReversedKeptCharacter(codex2, isKept2)
+    isDifferent = reversed1 != reversed2
+    unmatchedCount1 = (isDifferent & (reversed1 != 0)).sum(axis=1)
+    unmatchedCount2 = (isDifferent & (reversed2 != 0)).sum(axis=1)
+    isMatch = (MATCH_RATING_CODEX_MAX_LENGTH -
+               np.maximum(unmatchedCount1, unmatchedCount2)) >= minRating
+
+    # length differs by 3 or more, no result
+    isMatch[np.abs(length1 - length2) >= 3] = False
+    return isMatch
+
+
+def _getReversedKeptCharacter(codex: np.ndarray, isKept: np.ndarray) -> np.ndarray:
+    '''
+        move the kept characters of each row to the front in reversed order, padded by 0
+    '''
+    numberOfPair, width = codex.shape
+    # position counted from the last kept character, the character not kept goes to the extra column
+    positionFromEnd = np.cumsum(isKept[:, ::-1], axis=1)[:, ::-1] - 1
+    position = np.where(isKept, positionFromEnd, width)
+    reversedCodex = np.zeros((numberOfPair, width + 1), dtype=codex.dtype)
+    np.put_along_axis(reversedCodex, position, codex, axis=1)
+    return reversedCodex[:, :width]
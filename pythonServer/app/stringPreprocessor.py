@@ -1,3 +1,16 @@
+import re
+import weakref
+from typing import Callable
+
+# the memo of a preprocessor is replaced by a new one when it has more strings, so appending transactions for a long time doesn't grow it forever
+MAX_MEMO_SIZE = 1000000
+# the characters removed by preprocess, \w is the characters where str.isalnum() is True and '_', \s is the characters where str.isspace() is True
+NOT_ALPHANUMERIC_OR_SPACE = re.compile(r'[^\w\s]|_')
+# the strings are joined by this character in preprocessBatch, it is kept by the regular expression
+BATCH_SEPARATOR = '\x00'
+NOT_ALPHANUMERIC_OR_SPACE_OR_SEPARATOR = re.compile(r'[^\w\s\x00]|_')
+
+
 def preprocess(string):
     '''
         set all the letter to be lower case, only include alphanumeric characters
@@ -7,3 +20,44 @@ def preprocess(string):
     processed_string = ''.join([c for c in processed_string if c.isalnum() or c.isspace()])
     return processed_string
 
+
+def preprocessBatch(stringList: list[str]) -> list[str]:
+    '''
+        return [preprocess(string) for string in stringList], the strings are joined so that lower() and the removal of the characters are done once on the whole text.
+        the separator isn't cased, so lower() treats it like the end of a string ('Σ' at the end of a string is still lowered to 'ς')
+    '''
+    text = BATCH_SEPARATOR.join([string.strip() for string in stringList])
+    if text.count(BATCH_SEPARATOR) != len(stringList) - 1:
+        # a string contains the separator
+        return [NOT_ALPHANUMERIC_OR_SPACE.sub('', string.strip().lower()) for string in stringList]
+    return NOT_ALPHANUMERIC_OR_SPACE_OR_SEPARATOR.sub('', text.lower()).split(BATCH_SEPARATOR)
+
+
+# the preprocessors with a batch version, the others are called string by string
+BATCH_PREPROCESSORS = {preprocess: preprocessBatch}
+# preprocessor -> {string: preprocessed string}, a memo is removed with its preprocessor
+preprocessedStringMemos = weakref.WeakKeyDictionary()
+
+
+def preprocessStringList(stringList: list[str], stringPreprocessor: Callable[[str], str] = preprocess) -> list[str]:
+    '''
+        return [stringPreprocessor(string) for string in stringList], the preprocessed strings are memoised by stringPreprocessor,
+        so the strings preprocessed before (by any string clusterer) are not preprocessed again, the others are preprocessed in one batch if possible
+        assume stringPreprocessor always returns the same string for the same string
+    '''
+    memo = preprocessedStringMemos.get(stringPreprocessor)
+    if memo == None:
+        memo = preprocessedStringMemos.setdefault(stringPreprocessor, {})
+    newStringList = [string for string in dict.fromkeys(stringList) if string not in memo]
+    if len(newStringList) == 0:
+        return [memo[string] for string in stringList]
+    batchPreprocessor = BATCH_PREPROCESSORS.get(stringPreprocessor)
+    newStringMap = dict(zip(newStringList, batchPreprocessor(newStringList) if batchPreprocessor != None else [
+        stringPreprocessor(string) for string in newStringList]))
+    preprocessedStringList = [newStringMap[string] if string in newStringMap else memo[string] for string in stringList]
+    if len(memo) + len(newStringMap) > MAX_MEMO_SIZE:
+        # replaced instead of cleared, so the strings are not removed from the memo another thread is reading
+        preprocessedStringMemos[stringPreprocessor] = newStringMap
+    else:
+        memo.update(newStringMap)
+    return preprocessedStringList
@@ -0,0 +1,51 @@
+'''
+    compare two result files of benchmark.pipelineBenchmark, like the results of the main branch and of a change
+    run from the pythonServer folder: python -m benchmark.compareBenchmark oldResult.json newResult.json --threshold 1.2
+    the exit code is 1 if a stage is slower than threshold times the old time
+'''
+import argparse
+import json
+import sys
+
+
+def getResultKey(result: dict) -> tuple:
+    return (result['numberOfRow'], result['numberOfDescription'], result['stage'], json.dumps(result['parameters'], sort_keys=True))
+
+
+def compareResult(oldResultList: list[dict], newResultList: list[dict], threshold: float, minSeconds: float) -> list[tuple]:
+    '''
+        return (key, old seconds, new seconds) of the stages in both lists that are slower than threshold times the old time,
+        the stages faster than minSeconds in both lists are ignored because their time is mostly noise
+    '''
+    oldSeconds = {getResultKey(result): result['seconds'] for result in oldResultList}
+    regressionList = []
+    print(f"{'rows':>9}{'descs':>8}  {'stage':<26}{'parameters':<52}{'old (s)':>10}{'new (s)':>10}{'ratio':>8}")
+    for result in newResultList:
+        key = getResultKey(result)
+        if key not in oldSeconds:
+            continue
+        ratio = result['seconds'] / max(oldSeconds[key], 1e-9)
+        isRegression = ratio > threshold and max(result['seconds'], oldSeconds[key]) >= minSeconds
+        if isRegression:
+            regressionList.append((key, oldSeconds[key], result['seconds']))
+        parameterText = ' '.join(f'{name}={value}' for name, value in result['parameters'].items())
+        print(f"{key[0]:>9}{key[1]:>8}  {key[2]:<26}{parameterText:<52}{oldSeconds[key]:>10.4f}{result['seconds']:>10.4f}"
+              f"{ratio:>7.2f}x" + (' slower' if isRegression else ''))
+    return regressionList
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('oldResult')
+    parser.add_argument('newResult')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    parser.add_argument('--minSeconds', type=float, default=0.01)
+    args = parser.parse_args()
+    with open(args.oldResult) as file:
+        oldResult = json.load(file)
+    with open(args.newResult) as file:
+        newResult = json.load(file)
+    print(f"old: {oldResult['commit']} {oldResult['time']}\nnew: {newResult['commit']} {newResult['time']}")
+    regressionList = compareResult(oldResult['results'], newResult['results'], args.threshold, args.minSeconds)
+    print(f'{len(regressionList)} stages are more than {args.threshold}x slower')
+    sys.exit(1 if len(regressionList) > 0 else 0)
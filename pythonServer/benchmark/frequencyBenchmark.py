@@ -0,0 +1,66 @@
+'''
+    compare the time to compute the frequency with the previous implementation (groupby.apply with a pd.Series for each group)
+    and the vectorised aggregation used by TransactionDataset, for the 'category', 'transactionDescription' and clustered keys
+    run from the pythonServer folder: python -m benchmark.frequencyBenchmark
+'''
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.TransactionDataset import TransactionDataset, FrequencyOption, FrequencyUniqueKey, DistanceMeasure, LinkageMethod
+
+
+def getFrequencyByGroupApply(dataframe: pd.DataFrame, per: str) -> pd.Series:
+    '''
+        the previous implementation of TransactionDataset.__updateFrequency, kept to compare with
+    '''
+    def getFrequencyOfGroup(dataGroup):
+        firstTransactionDate = dataGroup['transactionDate'].min()
+        lastTransactionDate = dataGroup['transactionDate'].max()
+        if per == 'month':
+            length = (lastTransactionDate.year - firstTransactionDate.year) * 12 + \
+                lastTransactionDate.month - firstTransactionDate.month + 1
+        else:
+            length = (lastTransactionDate - firstTransactionDate).days + 1
+        return pd.Series({'frequency': dataGroup.shape[0] / length})
+    frequency = dataframe.groupby('frequencyUniqueKey').apply(
+        getFrequencyOfGroup)['frequency']
+    return dataframe['frequencyUniqueKey'].map(frequency)
+
+
+def runBenchmark(transactionDataset: TransactionDataset, numberOfRepeat: int):
+    frequencyOptionArgumentList = [
+        (FrequencyUniqueKey.CATEGORY,),
+        (FrequencyUniqueKey.TRANSACTION_DESCRIPTION,),
+        (FrequencyUniqueKey.CLUSTERED_TRANSACTION_DESCRIPTION,
+         DistanceMeasure.LEVENSHTEIN, LinkageMethod.AVERAGE, 100),
+    ]
+    print(f"{'frequencyUniqueKey':<34}{'per':<7}{'keys':>6}{'groupby.apply (s)':>19}{'vectorised (s)':>16}{'speedup':>10}{'same':>7}")
+    for frequencyOptionArgument in frequencyOptionArgumentList:
+        for per in ['month', 'day']:
+            frequencyOption = FrequencyOption(*frequencyOptionArgument, per=per)
+            # setFrequencyOption also computes the frequencyUniqueKey, so the speedup of the frequency part alone is greater
+            transactionDataset.setFrequencyOption(frequencyOption)
+            start = time.perf_counter()
+            for _ in range(numberOfRepeat):
+                transactionDataset.setFrequencyOption(frequencyOption)
+            newTime = (time.perf_counter() - start) / numberOfRepeat
+            dataframe = transactionDataset.getDataframe()
+            start = time.perf_counter()
+            for _ in range(numberOfRepeat):
+                oldFrequency = getFrequencyByGroupApply(dataframe, per)
+            oldTime = (time.perf_counter() - start) / numberOfRepeat
+            isSame = np.allclose(oldFrequency, dataframe['frequency'], rtol=0, atol=0)
+            print(f"{frequencyOption.getUniqueKey():<34}{per:<7}{dataframe['frequencyUniqueKey'].nunique():>6}"
+                  f"{oldTime:>19.4f}{newTime:>16.4f}{oldTime / newTime:>9.1f}x{str(isSame):>7}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csvPath', default=os.getcwd() + '/data/transaction_cleanedtest.csv')
+    parser.add_argument('--numberOfRepeat', type=int, default=5)
+    args = parser.parse_args()
+    runBenchmark(TransactionDataset(args.csvPath), args.numberOfRepeat)
@@ -0,0 +1,226 @@
+'''
+    send dashboard like traffic to the server from concurrent users and report the latency percentiles, the throughput and the errors of each endpoint
+    run from the pythonServer folder, against a running server:
+        python -m benchmark.loadTest --url http://127.0.0.1:8000 --user 16 --duration 30
+    or against a server started in this process (it loads data/transaction_cleanedtest.csv like uvicorn app.main:app):
+        python -m benchmark.loadTest --user 16 --duration 30 --mix transactionData=6 kmean=2 updateFrequencyInfo=2
+    the endpoints (and their parameters) are picked at random with the weights of --mix, each user sends its next request when the last one is answered
+    the test starts when GET /readiness says the string clusterers are warmed up
+'''
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.TransactionDataset import FrequencyUniqueKey, DistanceMeasure, LinkageMethod, KMeansEngine
+from app.dataframeResponse import ResponseFormat
+
+DEFAULT_MIX = {'transactionData': 6, 'kmean': 2, 'updateFrequencyInfo': 2}
+# the numerical columns the dashboard plots
+METRIC_LIST = ['transactionAmount', 'frequency', 'balance', 'transactionDate']
+REQUEST_TIMEOUT = 120
+
+
+def getTransactionDataParameters(randomGenerator: random.Random) -> list[tuple]:
+    # the table of the dashboard, sometimes filtered by date and paged
+    parameters = [('responseFormat', randomGenerator.choice(
+        [responseFormat.value for responseFormat in ResponseFormat]))]
+    if randomGenerator.random() < 0.5:
+        year = randomGenerator.randint(2016, 2022)
+        parameters += [('startDate', f'{year}-01-01'), ('endDate', f'{year + 1}-01-01')]
+    if randomGenerator.random() < 0.5:
+        parameters.append(('limit', randomGenerator.choice([50, 200, 1000])))
+    return parameters
+
+
+def getKMeanParameters(randomGenerator: random.Random) -> list[tuple]:
+    metric1, metric2 = randomGenerator.sample(METRIC_LIST, 2)
+    return [('metric1', metric1), ('metric2', metric2), ('numberOfCluster', randomGenerator.randint(2, 8)),
+            ('kmeanNInit', 10), ('kmeanMaxIteration', 300),
+            ('kmeanEngine', randomGenerator.choice([engine.value for engine in KMeansEngine]))]
+
+
+def getUpdateFrequencyInfoParameters(randomGenerator: random.Random) -> list[tuple]:
+    uniqueKey = randomGenerator.choice(list(FrequencyUniqueKey))
+    parameters = [('frequencyUniqueKey', uniqueKey.value), ('per', randomGenerator.choice(['month', 'day'])),
+                  ('changedColumnsOnly', 'true')] + getKMeanParameters(randomGenerator)
+    if uniqueKey == FrequencyUniqueKey.CLUSTERED_TRANSACTION_DESCRIPTION:
+        # few metrics and linkage methods, like a user trying the options of the dashboard, so the matrices are cached after the first requests
+        parameters += [('distanceMeasure', randomGenerator.choice([DistanceMeasure.LEVENSHTEIN, DistanceMeasure.JARO_WINKLER_SIMILARITY]).value),
+                       ('linkageMethod', randomGenerator.choice([LinkageMethod.AVERAGE, LinkageMethod.COMPLETE]).value),
+                       ('numberOfClusterForString', randomGenerator.randint(5, 50))]
+    if uniqueKey == FrequencyUniqueKey.TFIDF_CLUSTERED_TRANSACTION_DESCRIPTION:
+        parameters.append(('numberOfClusterForString', randomGenerator.randint(5, 50)))
+    return parameters
+
+
+SCENARIO_LIST = {
+    'transactionData': ('/transactionData', getTransactionDataParameters),
+    'kmean': ('/transactionData/kmean', getKMeanParameters),
+    'updateFrequencyInfo': ('/transactionData/updateFrequencyInfo', getUpdateFrequencyInfoParameters),
+}
+
+
+def sendRequest(url: str) -> tuple[int, float]:
+    '''
+        return (status code, seconds), the status code is 0 when the server can't be reached
+    '''
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def runUser(baseUrl: str, mix: dict[str, float], deadline: float, seed: int, results: list, resultsLock: threading.Lock):
+    '''
+        send requests one after the other until the deadline, add (scenario, status code, seconds) to results
+    '''
+    randomGenerator = random.Random(seed)
+    scenarioList = list(mix.keys())
+    weightList = list(mix.values())
+    while time.perf_counter() < deadline:
+        scenario = randomGenerator.choices(scenarioList, weightList)[0]
+        path, getParameters = SCENARIO_LIST[scenario]
+        status, seconds = sendRequest(
+            baseUrl + path + '?' + urllib.parse.urlencode(getParameters(randomGenerator)))
+        with resultsLock:
+            results.append((scenario, status, seconds))
+
+
+def getReport(results: list, duration: float) -> dict:
+    '''
+        return {scenario: {count, error, errorRate, throughput, mean, p50, p95, p99}}, the scenario 'all' has every request.
+        the latencies are in seconds, the throughput in requests per second, a status code >= 400 (or no response) is an error
+    '''
+    report = {}
+    for scenario in sorted(set(result[0] for result in results)) + ['all']:
+        selected = [result for result in results if scenario in ('all', result[0])]
+        seconds = np.array([result[2] for result in selected])
+        numberOfError = sum(1 for result in selected if result[1] == 0 or result[1] >= 400)
+        report[scenario] = {'count': len(selected), 'error': numberOfError, 'errorRate': numberOfError / len(selected),
+                            'throughput': len(selected) / duration, 'mean': float(seconds.mean()),
+                            'p50': float(np.percentile(seconds, 50)), 'p95': float(np.percentile(seconds, 95)),
+                            'p99': float(np.percentile(seconds, 99))}
+    return report
+
+
+def printReport(report: dict):
+    print(f"{'scenario':<22}{'count':>8}{'errors':>8}{'req/s':>9}{'mean (s)':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}")
+    for scenario, row in report.items():
+        print(f"{scenario:<22}{row['count']:>8}{row['error']:>8}{row['throughput']:>9.2f}{row['mean']:>10.4f}"
+              f"{row['p50']:>10.4f}{row['p95']:>10.4f}{row['p99']:>10.4f}")
+
+
+def startLocalServer() -> str:
+    '''
+        start the app in a thread of this process on a free port, return its url when it is ready
+    '''
+    import uvicorn
+    with socket.socket() as freeSocket:
+        freeSocket.bind(('127.0.0.1', 0))
+        port = freeSocket.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        'app.main:app', host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    # the dataset is loaded before the server is started, the string clusterers are warmed up in the background after, see waitUntilReady
+    while not server.started:
+        time.sleep(0.1)
+    return f'http://127.0.0.1:{port}'
+
+
+def waitUntilReady(baseUrl: str, timeout: float):
+    '''
+        poll GET /readiness until the string clusterers are warmed up, otherwise the requests would compete with the distance matrices being built.
+        raise TimeoutError if it isn't ready after timeout seconds
+    '''
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(baseUrl + '/readiness', timeout=REQUEST_TIMEOUT) as response:
+                readiness = json.loads(response.read())
+            if readiness['ready']:
+                return
+        except (urllib.error.URLError, OSError, ValueError, KeyError):
+            readiness = None
+        if time.perf_counter() > deadline:
+            raise TimeoutError(
+                f'{baseUrl} is not ready after {timeout}s, last readiness: {readiness}')
+        time.sleep(1)
+
+
+def runLoadTest(baseUrl: str, mix: dict[str, float], numberOfUser: int, duration: float, warmUp: float, seed: int) -> dict:
+    '''
+        run numberOfUser users for warmUp seconds (not reported, so the caches of the server are filled), then for duration seconds
+    '''
+    results = []
+    resultsLock = threading.Lock()
+    for phaseDuration, isReported in [(warmUp, False), (duration, True)]:
+        if phaseDuration <= 0:
+            continue
+        phaseResults = []
+        deadline = time.perf_counter() + phaseDuration
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=numberOfUser) as executor:
+            for user in range(numberOfUser):
+                executor.submit(runUser, baseUrl, mix, deadline,
+                                seed * 1000 + user + (0 if isReported else 500), phaseResults, resultsLock)
+        if isReported:
+            results = phaseResults
+            # the last requests can end after the deadline
+            duration = time.perf_counter() - start
+    return getReport(results, duration) if len(results) > 0 else {}
+
+
+def parseMix(mixList: list[str]) -> dict[str, float]:
+    mix = {}
+    for item in mixList:
+        scenario, _, weight = item.partition('=')
+        if scenario not in SCENARIO_LIST:
+            raise ValueError(f'{scenario} is invalid, only support {list(SCENARIO_LIST.keys())}')
+        mix[scenario] = float(weight or 1)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=None,
+                        help='the url of a running server, a server is started in this process by default')
+    parser.add_argument('--user', type=int, nargs='+', default=[1, 4, 16],
+                        help='the number of concurrent users, the test is run for each number')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmUp', type=float, default=5)
+    parser.add_argument('--mix', nargs='+', default=[f'{scenario}={weight}' for scenario, weight in DEFAULT_MIX.items()],
+                        help='scenario=weight, the scenarios are ' + ', '.join(SCENARIO_LIST.keys()))
+    parser.add_argument('--readyTimeout', type=float, default=1800,
+                        help='the maximum number of seconds to wait for GET /readiness to be ready before the test')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='save the reports as json')
+    args = parser.parse_args()
+
+    mix = parseMix(args.mix)
+    baseUrl = args.url.rstrip('/') if args.url != None else startLocalServer()
+    print(f'waiting for {baseUrl} to be ready')
+    waitUntilReady(baseUrl, args.readyTimeout)
+    reportList = []
+    for numberOfUser in args.user:
+        print(f'\n{numberOfUser} users for {args.duration}s against {baseUrl}')
+        report = runLoadTest(baseUrl, mix, numberOfUser, args.duration, args.warmUp, args.seed)
+        printReport(report)
+        reportList.append({'numberOfUser': numberOfUser, 'report': report})
+    if args.output != None:
+        with open(args.output, 'w') as file:
+            json.dump({'url': baseUrl, 'mix': mix, 'duration': args.duration, 'reports': reportList}, file, indent=1)
@@ -0,0 +1,143 @@
+'''
+    time the stages of the analytics pipeline on synthetic transactions (see benchmark.syntheticData) and save the results as json,
+    so the results of two commits can be compared with benchmark.compareBenchmark
+    run from the pythonServer folder:
+        python -m benchmark.pipelineBenchmark --numberOfRow 1000 100000 --numberOfDescription 100 5000 --output benchmarkResult.json
+    the linkage based string clusterers need n(n-1)/2 distances, they are skipped above --maxStringClusterSize unique descriptions,
+    the TF-IDF string clusterer is linear, it is always run
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from app.Cluster import LinkageBasedStringCluster, TfidfStringCluster
+from app.TransactionDataset import TransactionDataset, FrequencyOption, FrequencyUniqueKey, KMeansEngine
+from app.stringPreprocessor import preprocess
+from benchmark.syntheticData import writeCsv
+
+# the format of the json file, change it when the fields change
+BENCHMARK_RESULT_VERSION = 1
+
+
+def timeFunction(function, *args, **kwargs):
+    '''
+        return (result, seconds)
+    '''
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def getCommit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class BenchmarkRecorder:
+    '''
+        keep the results, print them while they are added
+    '''
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, numberOfRow: int, numberOfDescription: int, stage: str, seconds: float, **parameters):
+        self.results.append({'numberOfRow': numberOfRow, 'numberOfDescription': numberOfDescription,
+                             'stage': stage, 'parameters': parameters, 'seconds': seconds})
+        parameterText = ' '.join(f'{key}={value}' for key, value in parameters.items())
+        print(f'{numberOfRow:>9}{numberOfDescription:>8}  {stage:<26}{parameterText:<52}{seconds:>10.4f}')
+
+
+def runStringClusterBenchmark(recorder: BenchmarkRecorder, numberOfRow: int, uniqueStringList: list[str], numberOfCluster: int):
+    '''
+        for each distance metric, time the distance matrix with the first linkage method,
+        then the linkage matrix of each linkage method, _searchOptimalThreshold and the dendrogram cut of getClusterIdList
+    '''
+    numberOfDescription = len(uniqueStringList)
+    for distanceMetric in LinkageBasedStringCluster.VALID_DISTANCE_METRIC:
+        linkageMethodList = LinkageBasedStringCluster.VALID_LINKAGE_METHOD
+        clusterer, seconds = timeFunction(LinkageBasedStringCluster, uniqueStringList, numberOfCluster,
+                                          distanceMetric, linkageMethodList[0], preprocess)
+        recorder.add(numberOfRow, numberOfDescription, 'stringClusterBuild', seconds,
+                     distanceMetric=distanceMetric, linkageMethod=linkageMethodList[0])
+        for linkageMethod in linkageMethodList:
+            # the linkage matrix of the first method is cached by the constructor, so every method is timed without the cache
+            clusterer.linkageCache.clear()
+            _, seconds = timeFunction(clusterer.setLinkageMethod, linkageMethod)
+            recorder.add(numberOfRow, numberOfDescription, 'linkage', seconds,
+                         distanceMetric=distanceMetric, linkageMethod=linkageMethod)
+            _, seconds = timeFunction(clusterer._searchOptimalThreshold,
+                                      clusterer.linkageMatrix, numberOfCluster)
+            recorder.add(numberOfRow, numberOfDescription, 'searchOptimalThreshold', seconds,
+                         distanceMetric=distanceMetric, linkageMethod=linkageMethod)
+            _, seconds = timeFunction(clusterer.getClusterIdList, numberOfCluster)
+            recorder.add(numberOfRow, numberOfDescription, 'getClusterIdList', seconds,
+                         distanceMetric=distanceMetric, linkageMethod=linkageMethod)
+
+
+def runTfidfStringClusterBenchmark(recorder: BenchmarkRecorder, numberOfRow: int, uniqueStringList: list[str]):
+    numberOfDescription = len(uniqueStringList)
+    clusterer, seconds = timeFunction(TfidfStringCluster, uniqueStringList, 1, preprocess)
+    recorder.add(numberOfRow, numberOfDescription, 'tfidfStringClusterBuild', seconds)
+    for numberOfCluster in [10, 100]:
+        _, seconds = timeFunction(clusterer.getClusterIdList, min(numberOfCluster, numberOfDescription))
+        recorder.add(numberOfRow, numberOfDescription, 'tfidfGetClusterIdList', seconds, numberOfCluster=numberOfCluster)
+
+
+def runBenchmark(recorder: BenchmarkRecorder, numberOfRow: int, numberOfDescription: int, maxStringClusterSize: int, seed: int):
+    with tempfile.TemporaryDirectory() as directory:
+        csvPath = os.path.join(directory, 'transaction.csv')
+        writeCsv(csvPath, numberOfRow, numberOfDescription, seed)
+        # the load includes the frequency of the default frequency option
+        transactionDataset, seconds = timeFunction(TransactionDataset, csvPath)
+        recorder.add(numberOfRow, numberOfDescription, 'load', seconds)
+
+    # setFrequencyOption runs __updateFrequency
+    for uniqueKey in [FrequencyUniqueKey.CATEGORY, FrequencyUniqueKey.TRANSACTION_DESCRIPTION]:
+        for per in ['month', 'day']:
+            _, seconds = timeFunction(transactionDataset.setFrequencyOption, FrequencyOption(uniqueKey, per=per))
+            recorder.add(numberOfRow, numberOfDescription, 'updateFrequency', seconds,
+                         uniqueKey=uniqueKey.value, per=per)
+
+    # the results of clusterByKMeans are cached, each run has different arguments
+    for engine, nInit in [(KMeansEngine.EXACT, 10), (KMeansEngine.APPROXIMATE, 10)]:
+        _, seconds = timeFunction(transactionDataset.clusterByKMeans, 'transactionAmount', 'frequency', 5,
+                                  maxIteration=300, nInit=nInit, engine=engine)
+        recorder.add(numberOfRow, numberOfDescription, 'clusterByKMeans', seconds,
+                     engine=engine.value, numberOfCluster=5, nInit=nInit)
+
+    uniqueStringList = sorted(set(transactionDataset.getColumn('transactionDescription')))
+    runTfidfStringClusterBenchmark(recorder, numberOfRow, uniqueStringList)
+    if len(uniqueStringList) <= maxStringClusterSize:
+        runStringClusterBenchmark(recorder, numberOfRow, uniqueStringList, min(10, len(uniqueStringList)))
+    else:
+        print(f'skip the string clusterers of {len(uniqueStringList)} descriptions, see --maxStringClusterSize')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--numberOfRow', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--numberOfDescription', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--maxStringClusterSize', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmarkResult.json')
+    args = parser.parse_args()
+
+    recorder = BenchmarkRecorder()
+    print(f"{'rows':>9}{'descs':>8}  {'stage':<26}{'parameters':<52}{'seconds':>10}")
+    for numberOfRow in args.numberOfRow:
+        for numberOfDescription in args.numberOfDescription:
+            if numberOfDescription <= numberOfRow:
+                runBenchmark(recorder, numberOfRow, numberOfDescription, args.maxStringClusterSize, args.seed)
+    with open(args.output, 'w') as file:
+        json.dump({'version': BENCHMARK_RESULT_VERSION, 'commit': getCommit(), 'time': datetime.now(timezone.utc).isoformat(),
+                   'python': platform.python_version(), 'machine': platform.platform(), 'numberOfCpu': os.cpu_count(),
+                   'seed': args.seed, 'results': recorder.results}, file, indent=1)
+    print(f'saved {len(recorder.results)} results to {args.output}')
@@ -0,0 +1,66 @@
+'''
+    compare the time to build the condensed distance matrix with the previous implementation (pdist + np.vectorize(jellyfish))
+    and the batched implementation in app.stringDistance, for each distance metric
+    run from the pythonServer folder: python -m benchmark.stringDistanceBenchmark --numberOfString 1000
+    with --numberOfWorker, the batched implementation is also timed with a pool of processes
+'''
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.spatial.distance import pdist
+
+from app.Cluster import LinkageBasedStringCluster
+from app.stringDistance import getCondensedDistanceMatrix
+from app.stringPreprocessor import preprocess
+
+
+def getPreprocessedStringList(csvPath: str, numberOfString: int) -> list[str]:
+    '''
+        return the first numberOfString preprocessed unique transactionDescription of the csv file
+    '''
+    dataframe = pd.read_csv(csvPath)
+    uniqueStringList = sorted(set(dataframe['Transaction Description']))
+    return [preprocess(string) for string in uniqueStringList[:numberOfString]]
+
+
+def timeFunction(function, *args):
+    '''
+        return (result, seconds)
+    '''
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def runBenchmark(stringList: list[str], numberOfWorker: int = 1):
+    stringArray = pd.Series(stringList).to_numpy().reshape(len(stringList), 1)
+    # only used to reach the reference distance functions
+    clusterer = LinkageBasedStringCluster.__new__(LinkageBasedStringCluster)
+    print(f'number of string: {len(stringList)}, number of pair: {len(stringList) * (len(stringList) - 1) // 2}')
+    parallelHeader = f"{f'{numberOfWorker} workers (s)':>16}{'same':>7}" if numberOfWorker > 1 else ''
+    print(f"{'distanceMetric':<24}{'pdist (s)':>12}{'batched (s)':>14}{'speedup':>10}{'same':>7}" + parallelHeader)
+    for distanceMetric in LinkageBasedStringCluster.VALID_DISTANCE_METRIC:
+        oldMatrix, oldTime = timeFunction(
+            pdist, stringArray, clusterer._getDistanceFunction(distanceMetric, True))
+        newMatrix, newTime = timeFunction(
+            getCondensedDistanceMatrix, stringList, distanceMetric)
+        isSame = np.array_equal(oldMatrix, newMatrix)
+        parallelResult = ''
+        if numberOfWorker > 1:
+            parallelMatrix, parallelTime = timeFunction(
+                getCondensedDistanceMatrix, stringList, distanceMetric, numberOfWorker)
+            parallelResult = f'{parallelTime:>16.3f}{str(np.array_equal(newMatrix, parallelMatrix)):>7}'
+        print(f'{distanceMetric:<24}{oldTime:>12.3f}{newTime:>14.3f}{oldTime / newTime:>9.1f}x{str(isSame):>7}' + parallelResult)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csvPath', default=os.getcwd() + '/data/transaction_cleanedtest.csv')
+    parser.add_argument('--numberOfString', type=int, default=1000)
+    parser.add_argument('--numberOfWorker', type=int, default=1)
+    args = parser.parse_args()
+    runBenchmark(getPreprocessedStringList(
+        args.csvPath, args.numberOfString), args.numberOfWorker)
@@ -0,0 +1,90 @@
+'''
+    generate synthetic transactions with the same columns as data/transaction_cleanedtest.csv, for the benchmarks at any scale
+    run from the pythonServer folder: python -m benchmark.syntheticData --numberOfRow 100000 --numberOfDescription 5000 --output data/synthetic.csv
+'''
+import argparse
+
+import numpy as np
+import pandas as pd
+
+MERCHANT_LIST = ['SAVE THE CHANGE', 'LIDL GB', 'TESCO STORES', 'SAINSBURYS S/MKTS', 'AMAZON.CO.UK', 'PAYPAL *', 'TFL TRAVEL CH',
+                 'UBER *TRIP', 'DELIVEROO', 'COSTA COFFEE', 'STARBUCKS', 'MCDONALDS', 'BOOTS', 'ARGOS', 'NETFLIX.COM',
+                 'SPOTIFY', 'VIRGIN MEDIA', 'EDF ENERGY', 'COUNCIL TAX', 'RENT TO', 'TRANSFER FROM', 'ASDA SUPERSTORE',
+                 'ALDI', 'PRET A MANGER', 'GREGGS', 'SHELL', 'BP', 'NATIONAL RAIL', 'APPLE.COM/BILL', 'GOOGLE *']
+CITY_LIST = ['NOTTINGHAM', 'LONDON', 'MANCHESTER', 'LEEDS', 'BIRMINGHAM', 'BRISTOL', 'SHEFFIELD', 'LIVERPOOL']
+COUNTRY_LIST = ['Uk', 'Uk', 'Uk', 'Uk', 'Ireland', 'France']
+CATEGORY_LIST = ['Savings', 'Groceries', 'Others', 'Shopping', 'Transport', 'Bills', 'Dining', 'Entertainment', None]
+TRANSACTION_TYPE_LIST = ['BP', 'DEB', 'FPI', 'FPO', 'DD', 'SO', 'CPT', 'BGC']
+
+
+def getDescriptionList(numberOfDescription: int, randomGenerator: np.random.Generator) -> list[str]:
+    '''
+        return numberOfDescription unique descriptions like the bank statements: a merchant, a branch number and a city,
+        so the descriptions of a merchant are close to each other for the string distances
+    '''
+    descriptionSet = set()
+    while len(descriptionSet) < numberOfDescription:
+        merchant = MERCHANT_LIST[randomGenerator.integers(len(MERCHANT_LIST))]
+        branch = randomGenerator.integers(10000)
+        city = CITY_LIST[randomGenerator.integers(len(CITY_LIST))]
+        # keep the short forms like 'SAVE THE CHANGE' without a branch
+        form = randomGenerator.integers(4)
+        if form == 0:
+            descriptionSet.add(f'{merchant}')
+        elif form == 1:
+            descriptionSet.add(f'{merchant} {city[:9]}')
+        else:
+            descriptionSet.add(f'{merchant} {branch} {city}')
+    return sorted(descriptionSet)
+
+
+def generateTransactions(numberOfRow: int, numberOfDescription: int, seed: int = 0) -> pd.DataFrame:
+    '''
+        return a dataframe with the columns of the csv file (the first one is the unnamed index), the same seed gives the same transactions.
+        the descriptions are used with a Zipf like distribution, like real statements where a few merchants are used every week
+    '''
+    randomGenerator = np.random.default_rng(seed)
+    descriptionList = getDescriptionList(
+        min(numberOfDescription, numberOfRow), randomGenerator)
+    # every description is used at least once, the other rows follow the Zipf like distribution
+    weight = 1 / np.arange(1, len(descriptionList) + 1)
+    descriptionIndex = np.concatenate([np.arange(len(descriptionList)), randomGenerator.choice(
+        len(descriptionList), numberOfRow - len(descriptionList), p=weight / weight.sum())])
+    randomGenerator.shuffle(descriptionIndex)
+
+    # the transactions are sorted from the newest to the oldest, like the csv file
+    dayBefore = np.sort(randomGenerator.integers(0, 7 * 365, numberOfRow))
+    # only format each day once
+    dateString = (pd.Timestamp('2022-07-25') - pd.to_timedelta(np.arange(7 * 365), unit='D')).strftime('%d/%m/%Y').to_numpy()
+    isCredit = randomGenerator.random(numberOfRow) < 0.2
+    # the credits are fewer and bigger, like salaries
+    amount = np.round(randomGenerator.lognormal(3, 1.2, numberOfRow) * np.where(isCredit, 4, 1), 2)
+    balance = np.round(1000 + np.cumsum(np.where(isCredit, amount, -amount)[::-1])[::-1], 2)
+    categoryIndex = randomGenerator.integers(len(CATEGORY_LIST), size=numberOfRow)
+    return pd.DataFrame({
+        '': np.arange(numberOfRow),
+        'Transaction Number': np.arange(1, numberOfRow + 1),
+        'Transaction Date': dateString[dayBefore],
+        'Transaction Type': np.array(TRANSACTION_TYPE_LIST)[randomGenerator.integers(len(TRANSACTION_TYPE_LIST), size=numberOfRow)],
+        'Transaction Description': np.array(descriptionList, dtype=object)[descriptionIndex],
+        'Debit Amount': np.where(isCredit, np.nan, amount),
+        'Credit Amount': np.where(isCredit, amount, np.nan),
+        'Balance': balance,
+        'Category': np.array(CATEGORY_LIST, dtype=object)[categoryIndex],
+        'Location City': np.array([city.capitalize() for city in CITY_LIST])[randomGenerator.integers(len(CITY_LIST), size=numberOfRow)],
+        'Location Country': np.array(COUNTRY_LIST)[randomGenerator.integers(len(COUNTRY_LIST), size=numberOfRow)],
+    })
+
+
+def writeCsv(path: str, numberOfRow: int, numberOfDescription: int, seed: int = 0):
+    generateTransactions(numberOfRow, numberOfDescription, seed).to_csv(path, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--numberOfRow', type=int, default=10000)
+    parser.add_argument('--numberOfDescription', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='data/synthetic.csv')
+    args = parser.parse_args()
+    writeCsv(args.output, args.numberOfRow, args.numberOfDescription, args.seed)
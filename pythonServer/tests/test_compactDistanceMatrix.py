@@ -0,0 +1,35 @@
+import random
+import string
+
+import numpy as np
+import pytest
+
+from app.Cluster import LinkageBasedStringCluster
+from app.stringDistance import getCondensedDistanceMatrix, widenDistanceMatrix
+from app.stringPreprocessor import preprocess
+
+
+def getStringList(numberOfString: int, seed: int = 0) -> list[str]:
+    # short strings of few letters, so there are many equal distances (ties) between the pairs
+    randomGenerator = random.Random(seed)
+    return [''.join(randomGenerator.choice('abcde ') for _ in range(randomGenerator.randint(1, 8)))
+            for _ in range(numberOfString)]
+
+
+@pytest.mark.parametrize('distanceMetric', LinkageBasedStringCluster.VALID_DISTANCE_METRIC)
+def test_compactDistanceIsExact(distanceMetric: str):
+    stringList = getStringList(200)
+    distanceMatrix = getCondensedDistanceMatrix(stringList, distanceMetric)
+    compactDistanceMatrix = getCondensedDistanceMatrix(stringList, distanceMetric, compact=True)
+    assert np.array_equal(widenDistanceMatrix(compactDistanceMatrix, distanceMetric), distanceMatrix)
+
+
+@pytest.mark.parametrize('distanceMetric', ['jaroSimilarity', 'jaroWinklerSimilarity', 'levenshtein'])
+@pytest.mark.parametrize('linkageMethod', ['single', 'average', 'complete', 'ward'])
+def test_compactDistanceKeepsClusters(distanceMetric: str, linkageMethod: str):
+    stringList = getStringList(300)
+    clusterer = LinkageBasedStringCluster(stringList, 10, distanceMetric, linkageMethod, preprocess)
+    compactClusterer = LinkageBasedStringCluster(stringList, 10, distanceMetric, linkageMethod, preprocess,
+                                                 compactDistanceMatrix=True)
+    for numberOfCluster in [2, 10, 50]:
+        assert compactClusterer.getClusterIdList(numberOfCluster) == clusterer.getClusterIdList(numberOfCluster)
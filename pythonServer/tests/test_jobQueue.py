@@ -0,0 +1,52 @@
+import threading
+
+from app.jobQueue import JobQueue, JobResult
+
+
+def test_cancelledRunningJobDoesNotPublish():
+    jobQueue = JobQueue()
+    isStarted, isCancelled = threading.Event(), threading.Event()
+    published = []
+
+    def function(job):
+        isStarted.set()
+        isCancelled.wait(5)
+        jobQueue.runUnlessCancelled(job, lambda: published.append(job.jobId))
+        return JobResult(b'result', 'text/plain')
+    job = jobQueue.submit('test', function)
+    isStarted.wait(5)
+    jobQueue.cancel(job.jobId)
+    isCancelled.set()
+    job = jobQueue.wait(job.jobId, 5)
+    assert job.status == 'cancelled'
+    assert published == []
+    assert job.result == None
+
+
+def test_committedJobIsNotCancelled():
+    jobQueue = JobQueue()
+    isCommitted, isCancelled = threading.Event(), threading.Event()
+
+    def function(job):
+        jobQueue.runUnlessCancelled(job, lambda: None)
+        isCommitted.set()
+        isCancelled.wait(5)
+        return JobResult(b'result', 'text/plain')
+    job = jobQueue.submit('test', function)
+    isCommitted.wait(5)
+    jobQueue.cancel(job.jobId)
+    isCancelled.set()
+    job = jobQueue.wait(job.jobId, 5)
+    assert job.status == 'done'
+    assert job.result.content == b'result'
+
+
+def test_oldResultsAreDroppedAboveMaxResultSize():
+    jobQueue = JobQueue(maxResultSize=25)
+    jobList = []
+    for index in range(4):
+        job = jobQueue.submit('test', lambda job: JobResult(b'0123456789', 'text/plain'))
+        jobList.append(jobQueue.wait(job.jobId, 5))
+    assert [job.status for job in jobList] == ['done'] * 4
+    assert [job.isResultExpired for job in jobList] == [True, True, False, False]
+    assert jobQueue.resultSize == 20
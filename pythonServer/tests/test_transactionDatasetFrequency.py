@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.TransactionDataset import TransactionDataset, FrequencyOption, FrequencyUniqueKey
+
+# each description (and category) has a different number of transactions in the same month, so the frequencies are all different
+TRANSACTIONS = [('SHOP A', 'Groceries', 1), ('SHOP B', 'Bills', 2), ('SHOP C', 'Savings', 3)]
+
+
+@pytest.fixture
+def transactionDataset(tmp_path) -> TransactionDataset:
+    rows = []
+    for description, category, numberOfTransaction in TRANSACTIONS:
+        for _ in range(numberOfTransaction):
+            rows.append({'Transaction Number': len(rows) + 1, 'Transaction Date': f'{len(rows) + 1:02d}/07/2022', 'Transaction Type': 'DEB',
+                         'Transaction Description': description, 'Debit Amount': 1.5, 'Credit Amount': None, 'Balance': 100.0,
+                         'Category': category, 'Location City': 'Nottingham', 'Location Country': 'Uk'})
+    csvPath = tmp_path / 'transaction.csv'
+    pd.DataFrame(rows).to_csv(csvPath)
+    return TransactionDataset(str(csvPath))
+
+
+@pytest.mark.parametrize('uniqueKey', [FrequencyUniqueKey.TRANSACTION_DESCRIPTION, FrequencyUniqueKey.CATEGORY])
+def test_frequencyIsFloat(transactionDataset: TransactionDataset, uniqueKey: FrequencyUniqueKey):
+    transactionDataset.setFrequencyOption(FrequencyOption(uniqueKey))
+    dataframe = transactionDataset.getDataframe()
+    assert dataframe['frequency'].dtype == np.float64
+    assert sorted(set(dataframe['frequency'])) == [1.0, 2.0, 3.0]
+
+
+@pytest.mark.parametrize('uniqueKey', [FrequencyUniqueKey.TRANSACTION_DESCRIPTION, FrequencyUniqueKey.CATEGORY])
+def test_frequencyIsFloatAfterAppend(transactionDataset: TransactionDataset, uniqueKey: FrequencyUniqueKey):
+    transactionDataset.setFrequencyOption(FrequencyOption(uniqueKey))
+    transactionDataset.appendTransactions(pd.DataFrame([{
+        'transactionNumber': 100, 'transactionDate': '20/07/2022', 'transactionType': 'DEB', 'transactionDescription': 'SHOP D',
+        'debitAmount': 2.0, 'creditAmount': None, 'balance': 98.0, 'category': 'Travel', 'locationCity': 'Nottingham', 'locationCountry': 'Uk'}]))
+    dataframe = transactionDataset.getDataframe()
+    assert dataframe['frequency'].dtype == np.float64
+    assert dataframe['frequency'].notna().all()